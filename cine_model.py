@@ -0,0 +1,171 @@
+import math
+import re
+from functools import lru_cache
+
+# Pure model of a CineVideo composition, shared by modal_app.py and scripts/ (no Modal imports):
+# the composition length from remotion/Root.tsx, the scene timeline <TransitionSeries> in
+# remotion/CineVideo.tsx actually lays out, and the render cost model (tab budget, logged
+# features) that scripts/estimate_render.py calibrates.
+
+# getTransitionEffect: every transition except clockWipe runs on this spring
+TRANSITION_SPRING = {"damping": 200, "mass": 1.5, "stiffness": 50}
+SPRING_THRESHOLD = 0.005  # measureSpring's default, springTiming passes none
+
+def js_round(x):
+    # Math.round semantics (half up), Python's round() is banker's rounding
+    return math.floor(x + 0.5)
+
+def transition_frames(scenes, i, fps):
+    # What calculateVideoMetadata subtracts for the transition after scene i
+    scene = scenes[i]
+    if i < len(scenes) - 1 and scene.get("transitionAfter") and scene["transitionAfter"] != "none":
+        return js_round((scene.get("transitionDuration") or 1) * fps)
+    return 0
+
+def composition_frames(props):
+    # Mirror of calculateVideoMetadata in remotion/Root.tsx (CineVideo branch)
+    fps = props.get("fps") or 30
+    scenes = props.get("scenes", [])
+    total = 0
+    for i, scene in enumerate(scenes):
+        total += js_round(scene["durationInSeconds"] * fps) - transition_frames(scenes, i, fps)
+    return max(1, total), fps
+
+def spring_advance(current, velocity, last_ms, now_ms, damping, mass, stiffness):
+    # advance() in remotion/src/spring/spring-utils.ts, toValue 1
+    t = min(now_ms - last_ms, 64) / 1000
+    v0, x0 = -velocity, 1 - current
+    zeta = damping / (2 * math.sqrt(stiffness * mass))
+    omega0 = math.sqrt(stiffness / mass)
+    if zeta < 1:
+        omega1 = omega0 * math.sqrt(1 - zeta ** 2)
+        sin1, cos1 = math.sin(omega1 * t), math.cos(omega1 * t)
+        envelope = math.exp(-zeta * omega0 * t)
+        frag = envelope * (sin1 * ((v0 + zeta * omega0 * x0) / omega1) + x0 * cos1)
+        return 1 - frag, zeta * omega0 * frag - envelope * (cos1 * (v0 + zeta * omega0 * x0) - omega1 * x0 * sin1)
+    envelope = math.exp(-omega0 * t)
+    return (1 - envelope * (x0 + (v0 + omega0 * x0) * t),
+            envelope * (v0 * (t * omega0 - 1) + t * x0 * omega0 * omega0))
+
+@lru_cache(maxsize=None)
+def measure_spring(fps, damping=10, mass=1, stiffness=100, threshold=SPRING_THRESHOLD):
+    # measureSpring: first frame the spring is within threshold of 1 and stays there for 20 frames.
+    # springCalculation replays advance() from frame 0, so stepping once per frame is equivalent
+    state = {"current": 0.0, "velocity": 0.0, "last": 0.0}
+
+    def distance(frame):
+        now = frame / fps * 1000
+        state["current"], state["velocity"] = spring_advance(
+            state["current"], state["velocity"], state["last"], now, damping, mass, stiffness)
+        state["last"] = now
+        return abs(state["current"] - 1)
+
+    frame = 0
+    difference = distance(frame)
+    while difference >= threshold:
+        frame += 1
+        difference = distance(frame)
+    finished = frame
+    i = 0
+    while i < 20:
+        frame += 1
+        if distance(frame) >= threshold:
+            i = 0
+            finished = frame + 1
+        i += 1
+    return finished
+
+def transition_overlap(scenes, i, fps):
+    # Frames scene i really shares with scene i+1: <TransitionSeries> overlaps them by the timing's
+    # own duration, the measured spring for all but clockWipe (linearTiming of transitionDuration)
+    scene = scenes[i]
+    kind = scene.get("transitionAfter")
+    if i >= len(scenes) - 1 or not kind or kind == "none":
+        return 0
+    if kind == "clockWipe":
+        return js_round((scene.get("transitionDuration") or 1) * fps)
+    return measure_spring(fps, **TRANSITION_SPRING)
+
+def scene_offsets(props):
+    # Absolute start frame of each scene's <TransitionSeries.Sequence>
+    fps = props.get("fps") or 30
+    scenes = props.get("scenes", [])
+    offsets, start = [], 0
+    for i, scene in enumerate(scenes):
+        offsets.append(start)
+        start += js_round(scene["durationInSeconds"] * fps) - transition_overlap(scenes, i, fps)
+    return offsets
+
+# Anything that animates per frame keeps the scene in Chromium
+MOTION_KEYS = ("kenBurns", "zoomDirection", "particles", "visualizer", "chart", "progressBar", "titleCard", "lowerThird")
+VIDEO_RE = re.compile(r"\.(mp4|webm|mov|avi)$", re.IGNORECASE)  # isVideo in Scene.tsx
+
+TAB_BASE_MB = 400  # one Chromium tab on a plain image scene
+CPU_SHARE = 0.75  # leave cores for the encoder, as the old 24-of-32 did
+MEMORY_HEADROOM = 0.8
+
+def is_video(scene):
+    asset = (scene.get("assets") or [""])[0]
+    return bool(asset) and bool(VIDEO_RE.search(asset))
+
+def is_static_scene(scene):
+    return not is_video(scene) and all(scene.get(key) is None for key in MOTION_KEYS)
+
+def composition_cost(props):
+    # Relative per-tab cost of the heaviest scene (every tab eventually renders every scene)
+    heaviest = 1.0
+    for scene in props.get("scenes", []):
+        cost = 1.0
+        if scene.get("particles"):
+            cost += (scene["particles"].get("count") or 100) * 0.01  # ParticleSystem default count
+        if scene.get("visualizer"):
+            cost += (50 if scene["visualizer"].get("type", "bars") == "bars" else 80) * 0.005
+        if scene.get("chart"):
+            cost += 0.3
+        if is_video(scene):
+            cost += 1.5  # a <Video> decoder per tab
+        heaviest = max(heaviest, cost)
+    return round(heaviest, 2)
+
+def tab_concurrency(cpus, memory_mb, cost):
+    # Chromium tabs a container of this size can run for a composition of this cost
+    by_cpu = max(1, int(cpus * CPU_SHARE))
+    by_memory = max(1, int(memory_mb * MEMORY_HEADROOM / (TAB_BASE_MB * cost)))
+    return min(by_cpu, by_memory)
+
+def render_features(props):
+    # Frame counts per content type, logged with each job; scripts/estimate_render.py fits its weights on them
+    fps = props.get("fps") or 30
+    scenes = props.get("scenes", [])
+    features = {"frames": composition_frames(props)[0], "motion_frames": 0, "particle_frames": 0, "chart_frames": 0,
+                "visualizer_frames": 0, "video_frames": 0, "transition_frames": 0, "shorts_frames": 0}
+    for i, scene in enumerate(scenes):
+        frames = js_round(scene["durationInSeconds"] * fps)
+        if not is_static_scene(scene):
+            features["motion_frames"] += frames
+        if scene.get("particles") is not None:
+            features["particle_frames"] += frames * (scene["particles"].get("count") or 100) / 100
+        if scene.get("chart") is not None:
+            features["chart_frames"] += frames
+        if scene.get("visualizer") is not None:
+            features["visualizer_frames"] += frames
+        if is_video(scene):
+            features["video_frames"] += frames
+        features["transition_frames"] += transition_frames(scenes, i, fps)
+    for short in props.get("shorts") or []:
+        features["shorts_frames"] += max(1, js_round((short["endInSeconds"] - short["startInSeconds"]) * fps))
+    features["cost"] = composition_cost(props)
+    return features
+
+# Rendition ladder ("outputs"): ffmpeg bitrate syntax and the even sizes libx264 needs for yuv420p
+BITRATE_RE = re.compile(r"^(\d+(?:\.\d+)?)([kM]?)$")
+
+def bitrate_bps(rate):
+    # "800k", "2M", "2.5M" or plain bits per second
+    match = BITRATE_RE.match(str(rate))
+    if not match or float(match.group(1)) <= 0:
+        raise ValueError(f"Invalid bitrate {rate!r}, expected e.g. 800k, 2M or 800000")
+    return int(float(match.group(1)) * {"": 1, "k": 1000, "M": 1000000}[match.group(2)])
+
+def even_dimension(size):
+    return max(2, 2 * js_round(size / 2))
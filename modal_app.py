@@ -1,10 +1,29 @@
-# Modal App for Remotion Rendering - v1.3.2 (Hybrid Response)
+# Modal App for Remotion Rendering - v1.4.0 (Cached Bundle)
 import modal
 import os
 import json
 import subprocess
 import time
 import shutil
+import glob
+import hashlib
+import uuid
+import math
+import asyncio
+import copy
+import threading
+import re
+import socket
+import queue
+from contextlib import contextmanager
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from functools import partial
+
+from cine_model import (MEMORY_HEADROOM, VIDEO_RE, bitrate_bps, composition_cost, composition_frames, even_dimension,
+                        is_static_scene, js_round, render_features, scene_offsets, tab_concurrency, transition_overlap)
 
 # 1. Base Image
 remotion_image = (
@@ -15,6 +34,7 @@ remotion_image = (
         "libatk-bridge2.0-0", "libcups2", "ffmpeg", "fonts-noto-color-emoji", "fonts-liberation",
         "libgtk-3-0", "libxshmfence1", "libglu1-mesa"
     )
+    .pip_install("Pillow")
     .run_commands(
         "curl -fsSL https://deb.nodesource.com/setup_20.x | bash -",
         "apt-get install -y nodejs"
@@ -26,101 +46,2031 @@ remotion_image = (
         "npm install",
         "./node_modules/.bin/remotion browser ensure"
     )
+    .add_local_python_source("cine_model")
 )
 
 app = modal.App("remotion-video-service")
 results_volume = modal.Volume.from_name("remotion-results", create_if_missing=True)
 
+REMOTION_BIN = "./node_modules/.bin/remotion"
+CHROMIUM_FLAGS = "--no-sandbox --disable-setuid-sandbox --disable-dev-shm-usage --disable-gpu"
+CHUNK_FRAMES = 1800  # 60s at 30fps per fan-out container
+FANOUT_MIN_FRAMES = 2 * CHUNK_FRAMES
+BUNDLE_ROOT = "/results/_bundles"
+# Everything that ends up inside the webpack bundle
+BUNDLE_SOURCES = ["remotion/**/*", "public/**/*", "remotion.config.ts", "package-lock.json"]
+
+# 2. Bundle Cache (one bundle per source hash, shared via the volume)
+def bundle_hash():
+    h = hashlib.sha256()
+    paths = sorted({p for pattern in BUNDLE_SOURCES for p in glob.glob(pattern, recursive=True) if os.path.isfile(p)})
+    for path in paths:
+        h.update(path.encode())
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+def ensure_bundle(env):
+    digest = bundle_hash()
+    bundle_dir = f"{BUNDLE_ROOT}/{digest}"
+    results_volume.reload()
+    if os.path.exists(f"{bundle_dir}/index.html"):
+        print(f"📦 Bundle cache hit ({digest})")
+        return bundle_dir, digest, True
+
+    print(f"📦 Bundle cache miss ({digest}), bundling...")
+    build_dir = f"/tmp/bundle_{digest}_{uuid.uuid4().hex[:8]}"
+    staging_dir = f"{bundle_dir}.partial-{uuid.uuid4().hex[:8]}"
+    subprocess.run([REMOTION_BIN, "bundle", "remotion/index.ts", "--out-dir", build_dir, "--log=error"], check=True, env=env)
+    try:
+        os.makedirs(BUNDLE_ROOT, exist_ok=True)
+        shutil.copytree(build_dir, staging_dir)
+        # Another container may have published the same hash meanwhile; keep theirs
+        try:
+            os.rename(staging_dir, bundle_dir)
+        except OSError:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        results_volume.commit()
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+    return bundle_dir, digest, False
+
+def remotion_env():
+    env = os.environ.copy()
+    env["REMOTION_LOG"] = "error"
+    env["REMOTION_IGNORE_MEMORY_LIMIT_CHECK"] = "true"
+    return env
+
+def remotion_render(composition, output, bundle_path, props_path, env, concurrency=24, frames=None, muted=False,
+                    progress=None, stage=None):
+    # Inside a RenderWorker container the warm sidecar takes the job instead of a fresh CLI process
+    if sidecar and sidecar.bundle_path == bundle_path:
+        return sidecar.render(composition, output, props_path, concurrency, frames, muted, progress, stage)
+    extra = (["--frames", f"{frames[0]}-{frames[1]}"] if frames else []) + (["--muted"] if muted else [])
+    cmd = [
+        REMOTION_BIN, "render", composition, output,
+        "--bundle", bundle_path, "--props", props_path,
+        "--concurrency", str(concurrency), "--log=info" if progress else "--log=error",
+        *extra,
+        "--chromium-flags", CHROMIUM_FLAGS
+    ]
+    if not progress:
+        subprocess.run(cmd, check=True, env=env)
+        return
+    # Progress lines only exist at info level; the reader keeps the pipe drained
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+    progress.track(proc.stdout, stage or composition)
+    if proc.wait() != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+# 3. Frame-range Fan-out
+# Composition length and scene timeline come from cine_model.py (Root.tsx / <TransitionSeries>)
+def chunk_ranges(total_frames, chunk_frames):
+    # Inclusive [start, end] ranges in absolute composition frames, so TransitionSeries
+    # overlaps straddling a boundary are rendered identically on both sides
+    return [(start, min(start + chunk_frames, total_frames) - 1) for start in range(0, total_frames, chunk_frames)]
+
+def concat_copy(parts, output, audio_path=None):
+    list_path = f"{output}.txt"
+    with open(list_path, "w") as f:
+        for part in parts:
+            f.write(f"file '{part}'\n")
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_path:
+        cmd += ["-i", audio_path, "-map", "0:v", "-map", "1:a?", "-shortest"]
+    subprocess.run(cmd + ["-c", "copy", "-movflags", "+faststart", output], check=True)
+    os.remove(list_path)
+
+@app.function(
+    image=remotion_image,
+    cpu=16,
+    memory=32768,
+    timeout=3600,
+    volumes={"/results": results_volume},
+    retries=0
+)
+def render_chunk(job_id: str, bundle_path: str, props: dict, index: int, start: int, end: int, chunk_path: str = None):
+    # Muted: the audio track is rendered once by the coordinator
+    props_path = f"/tmp/{job_id}_chunk_{index}.json"
+    chunk_out = f"/tmp/{job_id}_chunk_{index}.mp4"
+    local_props, server, _ = prefetch_local(props)
+    with open(props_path, "w") as f:
+        json.dump(local_props, f)
+
+    print(f"🧩 Chunk {index} [{start}-{end}]...")
+    metrics = JobMetrics(job_id)
+    try:
+        with metrics.stage(f"chunk_{index}", frames=end - start + 1) as stage:
+            remotion_render("CineVideo", chunk_out, bundle_path, props_path, remotion_env(),
+                            concurrency=pick_concurrency(props)[0], frames=(start, end), muted=True)
+            stage["outputs"].append(chunk_out)
+        chunk_path = chunk_path or f"/results/{job_id}/chunks/chunk_{index:04d}.mp4"
+        os.makedirs(os.path.dirname(chunk_path), exist_ok=True)
+        # Segments are reused by later jobs, so never publish a half-copied file
+        staging = f"{chunk_path}.{uuid.uuid4().hex[:8]}.partial"
+        shutil.move(chunk_out, staging)
+        os.replace(staging, chunk_path)
+        results_volume.commit()
+        return {"path": chunk_path, "metrics": metrics.stages[0]}
+    finally:
+        server.shutdown()
+        if os.path.exists(props_path): os.remove(props_path)
+        if os.path.exists(chunk_out): os.remove(chunk_out)
+
+AUDIO_RATE = 48000
+DUCK_PERIOD = 60  # CineVideo ducks music over f % 60: v -> 0.7v -> v
+
+def audio_source(src, bundle_path):
+    # Bare paths resolve against the bundle like <Audio src> does in the page
+    if urlparse(src).scheme or os.path.isabs(src):
+        return src
+    return os.path.join(bundle_path, "public", src)
+
+def audio_timeline(props):
+    # (start_frame, duration_frames, fade_frames, src) per scene with audio, mirroring Scene.tsx;
+    # starts are where <TransitionSeries> really places each scene (spring-measured overlaps)
+    fps = props.get("fps") or 30
+    scenes = props.get("scenes", [])
+    clips = []
+    for scene, start in zip(scenes, scene_offsets(props)):
+        if scene.get("audio"):
+            # Scene fades its audio over transitionFrames even without a transition
+            fade = max(1, js_round((scene.get("transitionDuration") or 1) * fps))
+            clips.append((start, js_round(scene["durationInSeconds"] * fps), fade, scene["audio"]))
+    return clips
+
+def mixdown_command(props, bundle_path, output):
+    total_frames, fps = composition_frames(props)
+    total = total_frames / fps
+    fmt = f"aformat=sample_rates={AUDIO_RATE}:channel_layouts=stereo"
+    inputs = ["-f", "lavfi", "-t", f"{total:.6f}", "-i", f"anullsrc=r={AUDIO_RATE}:cl=stereo"]
+    graph, labels = [], ["[0:a]"]
+
+    music = props.get("backgroundMusic")
+    if music:
+        level = props.get("backgroundMusicVolume", 0.1)
+        if props.get("audioDucking", True):
+            phase = f"mod(floor(t*{fps}),{DUCK_PERIOD})"
+            gain = f"{level}*(0.7+0.3*abs({phase}-{DUCK_PERIOD // 2})/{DUCK_PERIOD // 2})"
+        else:
+            gain = str(level)
+        inputs += ["-stream_loop", "-1", "-i", audio_source(music, bundle_path)]
+        graph.append(f"[1:a]{fmt},atrim=0:{total:.6f},volume=eval=frame:volume='{gain}'[music]")
+        labels.append("[music]")
+
+    for n, (start, frames, fade, src) in enumerate(audio_timeline(props)):
+        index = len(labels)
+        length = frames / fps
+        # interpolate(frame, [0, T, d - T, d], [0, 1, 1, 0]) with clamping
+        envelope = f"clip(min(floor(t*{fps})/{fade},({frames}-floor(t*{fps}))/{fade}),0,1)"
+        inputs += ["-i", audio_source(src, bundle_path)]
+        graph.append(f"[{index}:a]{fmt},atrim=0:{length:.6f},asetpts=PTS-STARTPTS,"
+                     f"volume=eval=frame:volume='{envelope}',adelay={start * 1000 // fps}:all=1[s{n}]")
+        labels.append(f"[s{n}]")
+
+    graph.append(f"{''.join(labels)}amix=inputs={len(labels)}:duration=first:normalize=0[a]")
+    return [
+        "ffmpeg", "-y", "-loglevel", "error", *inputs, "-filter_complex", ";".join(graph),
+        "-map", "[a]", "-t", f"{total:.6f}", "-c:a", "aac", "-b:a", "320k", output
+    ]
+
+def render_audio(job_id, bundle_path, input_path, env):
+    # Offline ffmpeg mixdown of the scene timeline, started in the background while frames are
+    # captured muted; the caller waits on it before stitching
+    audio_path = f"/tmp/{job_id}_audio.aac"
+    with open(input_path) as f:
+        props = json.load(f)
+    proc = subprocess.Popen(mixdown_command(props, bundle_path, audio_path), env=env)
+    return proc, audio_path
+
+def render_ranges(job_id, bundle_path, input_data, input_path, output, env, ranges, paths=None, progress=None, workers=None,
+                  hls=None):
+    # ranges: [(start, end)] rendered muted in parallel containers, or reused when paths[i] already exists.
+    # Each container's stage record is appended to workers; the coordinator's RSS doesn't include them.
+    # hls (HlsEventPlaylist) gets every chunk as it lands.
+    paths = paths or [None] * len(ranges)
+    audio_proc, audio_path = render_audio(job_id, bundle_path, input_path, env)
+    if hls:
+        hls.attach(ranges, audio_proc, audio_path)
+    try:
+        todo = [i for i, path in enumerate(paths) if not (path and os.path.exists(path))]
+        reused = [i for i in range(len(ranges)) if i not in todo]
+        rendered = render_chunk.starmap(
+            [(job_id, bundle_path, input_data, i, ranges[i][0], ranges[i][1], paths[i]) for i in todo]
+        )
+        for done, (i, result) in enumerate(zip(todo, rendered), 1):
+            paths[i] = result["path"]
+            if workers is not None:
+                workers.append(result["metrics"])
+            if hls:
+                # Reused chunks go in with the first result, so the starmap is already dispatched
+                results_volume.reload()
+                for j in reused + [i]:
+                    hls.add(j, paths[j])
+                reused = []
+            if progress:
+                progress.publish({"stage": "main_render", "phase": "chunks", "frames": done, "total": len(todo)})
+        if hls:
+            for j in reused:
+                hls.add(j, paths[j])
+        if audio_proc.wait() != 0:
+            raise subprocess.CalledProcessError(audio_proc.returncode, "ffmpeg audio mixdown")
+
+        results_volume.reload()
+        concat_copy(paths, output, audio_path)
+        shutil.rmtree(f"/results/{job_id}/chunks", ignore_errors=True)
+        return len(todo)
+    finally:
+        if audio_proc.poll() is None: audio_proc.kill()
+        if os.path.exists(audio_path): os.remove(audio_path)
+
+def render_main_fanout(job_id, bundle_path, input_data, input_path, output, env, total_frames, chunk_frames, progress=None, workers=None,
+                       hls=None):
+    ranges = chunk_ranges(total_frames, chunk_frames)
+    # Fixed chunk paths in the job dir: a retried job reuses every chunk that was committed
+    paths = [chunk_checkpoint(job_id, i) for i in range(len(ranges))]
+    print(f"🚀 Render Main across {len(ranges)} containers...")
+    return render_ranges(job_id, bundle_path, input_data, input_path, output, env, ranges, paths, progress, workers, hls)
+
+# 4. Shorts derived from the main render
+MAIN_SIZE = (1920, 1080)
+SHORT_SIZE = (1080, 1920)
+SHORTS_ZOOM = 1.2  # ShortsVideo.tsx scales the 1920x1080 stage by height / 1080 * 1.2
+
+def has_audio(path):
+    out = subprocess.run([
+        "ffprobe", "-v", "error", "-select_streams", "a", "-show_entries", "stream=index", "-of", "csv=p=0", path
+    ], check=True, capture_output=True, text=True).stdout
+    return bool(out.strip())
+
+def shorts_crop():
+    # Region of the main frame that stays visible after ShortsVideo's centred scale
+    scale = SHORT_SIZE[1] / MAIN_SIZE[1] * SHORTS_ZOOM
+    w = int(SHORT_SIZE[0] / scale) // 2 * 2
+    h = int(SHORT_SIZE[1] / scale) // 2 * 2
+    return w, h, (MAIN_SIZE[0] - w) // 2, (MAIN_SIZE[1] - h) // 2
+
+def derive_shorts(main_path, shorts, fps):
+    # shorts: [(config, output_path)] — one decode of main_path, one split branch per short
+    n = len(shorts)
+    w, h, x, y = shorts_crop()
+    with_audio = has_audio(main_path)
+    graph = [f"[0:v]split={n}" + "".join(f"[s{i}]" for i in range(n))]
+    if with_audio:
+        graph.append(f"[0:a]asplit={n}" + "".join(f"[as{i}]" for i in range(n)))
+
+    outputs = []
+    for i, (short, output) in enumerate(shorts):
+        # Same frame maths as ShortsVideo / calculateVideoMetadata
+        start = js_round(short["startInSeconds"] * fps)
+        end = start + max(1, js_round((short["endInSeconds"] - short["startInSeconds"]) * fps))
+        graph.append(
+            f"[s{i}]trim=start_frame={start}:end_frame={end},setpts=PTS-STARTPTS,"
+            f"crop={w}:{h}:{x}:{y},scale={SHORT_SIZE[0]}:{SHORT_SIZE[1]}:flags=lanczos,setsar=1[v{i}]"
+        )
+        outputs += ["-map", f"[v{i}]"]
+        if with_audio:
+            graph.append(f"[as{i}]atrim=start={start / fps}:end={end / fps},asetpts=PTS-STARTPTS[a{i}]")
+            outputs += ["-map", f"[a{i}]", "-c:a", "aac", "-b:a", "192k"]
+        outputs += ["-r", str(fps), "-c:v", "libx264", "-crf", "18", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+                    "-movflags", "+faststart", output]
+
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error", "-i", main_path,
+        "-filter_complex", ";".join(graph), *outputs
+    ], check=True)
+
 @app.function(
+    image=remotion_image,
+    cpu=16,
+    memory=32768,
+    timeout=3600,
+    volumes={"/results": results_volume},
+    retries=0
+)
+def render_short(job_id: str, bundle_path: str, props: dict, index: int):
+    short_out = f"/tmp/{job_id}_short_{index}.mp4"
+    short_props_path = f"/tmp/{job_id}_short_{index}.json"
+
+    s_props, server, _ = prefetch_local(props, display_scale=SHORT_SIZE[1] / MAIN_SIZE[1] * SHORTS_ZOOM)
+    s_props["selectedShortIndex"] = index
+    with open(short_props_path, "w") as f:
+        json.dump(s_props, f)
+
+    print(f"🎬 Short {index+1}...")
+    metrics = JobMetrics(job_id)
+    try:
+        short = props["shorts"][index]
+        frames = max(1, js_round((short["endInSeconds"] - short["startInSeconds"]) * (props.get("fps") or 30)))
+        with metrics.stage(f"short_{index+1}", frames=frames) as stage:
+            remotion_render("ShortsVideo", short_out, bundle_path, short_props_path, remotion_env(),
+                            concurrency=pick_concurrency(props)[0])
+            stage["outputs"].append(short_out)
+        short_path = f"/results/{job_id}/short_{index+1}.mp4"
+        # A resumed job skips shorts that exist, so never leave a half-copied one under the final name
+        staging = f"{short_path}.{uuid.uuid4().hex[:8]}.partial"
+        shutil.move(short_out, staging)
+        os.replace(staging, short_path)
+        results_volume.commit()
+        return {"path": short_path, "metrics": metrics.stages[0]}
+    finally:
+        server.shutdown()
+        if os.path.exists(short_out): os.remove(short_out)
+        if os.path.exists(short_props_path): os.remove(short_props_path)
+
+# 5. Asset Prefetch (download once, serve to Chromium from localhost)
+ASSET_CACHE_DIR = "/tmp/assets"
+PREFETCH_CONCURRENCY = 16
+
+def collect_urls(props):
+    urls = []
+    for scene in props.get("scenes", []):
+        urls += scene.get("assets", [])
+        urls.append(scene.get("audio"))
+    urls.append(props.get("backgroundMusic"))
+    urls.append((props.get("watermark") or {}).get("imageUrl"))
+    return [u for u in dict.fromkeys(urls) if u and u.startswith(("http://", "https://"))]
+
+def asset_filename(url):
+    ext = os.path.splitext(urlparse(url).path)[1][:8]
+    return hashlib.sha256(url.encode()).hexdigest()[:24] + ext
+
+def download(url, path):
+    partial_path = f"{path}.{uuid.uuid4().hex[:8]}.partial"
+    req = urllib.request.Request(url, headers={"User-Agent": "remotion-video-service"})
+    with urllib.request.urlopen(req, timeout=120) as resp, open(partial_path, "wb") as f:
+        shutil.copyfileobj(resp, f, 1 << 20)
+        etag = resp.headers.get("ETag")
+    os.replace(partial_path, path)
+    return etag
+
+async def prefetch_assets(urls, cache_dir=ASSET_CACHE_DIR, concurrency=PREFETCH_CONCURRENCY, fetch=download):
+    # Returns {url: local_path} for every URL that could be fetched
+    os.makedirs(cache_dir, exist_ok=True)
+    sem = asyncio.Semaphore(concurrency)
+    inflight = {}
+
+    async def fetch_one(url):
+        path = os.path.join(cache_dir, asset_filename(url))
+        if not os.path.exists(path):
+            async with sem:
+                await asyncio.to_thread(fetch, url, path)
+        return path
+
+    for url in urls:
+        if url not in inflight:
+            inflight[url] = asyncio.ensure_future(fetch_one(url))
+    results = await asyncio.gather(*inflight.values(), return_exceptions=True)
+
+    local = {}
+    for url, result in zip(inflight, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ Prefetch failed, Chromium will fetch it: {url} ({result})")
+        else:
+            local[url] = result
+    return local
+
+class AssetHandler(SimpleHTTPRequestHandler):
+    def end_headers(self):
+        # The page comes from the bundle server (another origin); <Img>/<Video>/<Audio> load from here,
+        # so any CORS-mode request for an asset must not be refused
+        self.send_header("Access-Control-Allow-Origin", "*")
+        super().end_headers()
+
+    def log_message(self, *args):
+        pass
+
+def start_asset_server(cache_dir=ASSET_CACHE_DIR):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(AssetHandler, directory=cache_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def rewrite_props(props, url_map):
+    local = copy.deepcopy(props)
+    for scene in local.get("scenes", []):
+        scene["assets"] = [url_map.get(u, u) for u in scene.get("assets", [])]
+        if scene.get("audio"):
+            scene["audio"] = url_map.get(scene["audio"], scene["audio"])
+    if local.get("backgroundMusic"):
+        local["backgroundMusic"] = url_map.get(local["backgroundMusic"], local["backgroundMusic"])
+    if (local.get("watermark") or {}).get("imageUrl"):
+        local["watermark"]["imageUrl"] = url_map.get(local["watermark"]["imageUrl"], local["watermark"]["imageUrl"])
+    return local
+
+# 6. Shared Asset Store (content-addressed, LRU-evicted, on the results volume)
+ASSET_STORE_DIR = "/results/_assets"
+ASSET_STORE_BUDGET = int(os.environ.get("ASSET_STORE_BUDGET", 20 * 1024 ** 3))
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class AssetStore:
+    # index.json: "urls" maps URL -> {blob, etag, last_used}; "blobs" maps blob name -> size.
+    # Blobs are named by content hash, so identical files behind different URLs are stored once.
+    # URLs cached with an ETag are revalidated with a HEAD request, others are treated as immutable.
+    def __init__(self, root=ASSET_STORE_DIR, budget=ASSET_STORE_BUDGET, fetch=download):
+        self.root = root
+        self.budget = budget
+        self.fetch_remote = fetch
+        self.index_path = f"{root}/index.json"
+        self.lock = threading.Lock()
+        self.index = self._load()
+        self.touched = {}
+        self.new_blobs = {}
+        self.stats = {"hits": 0, "misses": 0, "bytes_saved": 0, "bytes_fetched": 0, "evicted": 0}
+
+    def _load(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"urls": {}, "blobs": {}}
+
+    def _etag(self, url):
+        req = urllib.request.Request(url, method="HEAD", headers={"User-Agent": "remotion-video-service"})
+        try:
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                return resp.headers.get("ETag")
+        except Exception:
+            return None
+
+    def _fresh(self, url, entry):
+        if not entry or not os.path.exists(f"{self.root}/{entry['blob']}"):
+            return False
+        if not entry.get("etag"):
+            return True
+        # An unreachable origin keeps the cached copy usable
+        return self._etag(url) in (None, entry["etag"])
+
+    def fetch(self, url, path):
+        entry = self.index["urls"].get(url)
+        if self._fresh(url, entry):
+            shutil.copyfile(f"{self.root}/{entry['blob']}", path)
+            with self.lock:
+                self.stats["hits"] += 1
+                self.stats["bytes_saved"] += self.index["blobs"].get(entry["blob"], 0)
+                self.touched[url] = dict(entry, last_used=time.time())
+            return entry.get("etag")
+
+        etag = self.fetch_remote(url, path)
+        size = os.path.getsize(path)
+        blob = file_sha256(path)[:32] + os.path.splitext(path)[1]
+        blob_path = f"{self.root}/{blob}"
+        if not os.path.exists(blob_path):
+            os.makedirs(self.root, exist_ok=True)
+            staging = f"{blob_path}.{uuid.uuid4().hex[:8]}.partial"
+            shutil.copyfile(path, staging)
+            os.replace(staging, blob_path)
+        with self.lock:
+            self.stats["misses"] += 1
+            self.stats["bytes_fetched"] += size
+            self.touched[url] = {"blob": blob, "etag": etag, "last_used": time.time()}
+            self.new_blobs[blob] = size
+        return etag
+
+    def save(self):
+        # Merge into the latest index so concurrent jobs don't drop each other's entries
+        if not self.touched:
+            return
+        with self.lock:
+            results_volume.reload()
+            index = self._load()
+            index["urls"].update(self.touched)
+            index["blobs"].update(self.new_blobs)
+
+            last_used = {}
+            for entry in index["urls"].values():
+                last_used[entry["blob"]] = max(last_used.get(entry["blob"], 0), entry["last_used"])
+            in_use = {entry["blob"] for entry in self.touched.values()}
+            total = sum(index["blobs"].values())
+            for blob in sorted(index["blobs"], key=lambda b: last_used.get(b, 0)):
+                if total <= self.budget:
+                    break
+                if blob in in_use:
+                    continue
+                total -= index["blobs"].pop(blob)
+                if os.path.exists(f"{self.root}/{blob}"): os.remove(f"{self.root}/{blob}")
+                self.stats["evicted"] += 1
+            index["urls"] = {u: e for u, e in index["urls"].items() if e["blob"] in index["blobs"]}
+
+            os.makedirs(self.root, exist_ok=True)
+            staging = f"{self.index_path}.{uuid.uuid4().hex[:8]}"
+            with open(staging, "w") as f:
+                json.dump(index, f)
+            os.replace(staging, self.index_path)
+            results_volume.commit()
+            self.index = index
+
+def prefetch_local(props, display_scale=1.0):
+    # Local http:// rather than file:// URLs: Chromium blocks file:// from the bundle's origin,
+    # and Scene/CineVideo treat anything not starting with http as a staticFile() path
+    started = time.time()
+    urls = collect_urls(props)
+    store = AssetStore()
+    local = asyncio.run(prefetch_assets(urls, fetch=store.fetch))
+    store.save()
+    server, base_url = start_asset_server()
+    url_map = {url: f"{base_url}/{os.path.basename(path)}" for url, path in local.items()}
+    local_props = rewrite_props(props, url_map)
+    stats = {"urls": len(urls), "local": len(local), "seconds": round(time.time() - started, 2), "store": store.stats}
+    print(f"📥 Prefetched {len(local)}/{len(urls)} assets in {stats['seconds']}s "
+          f"(store: {store.stats['hits']} hits, {store.stats['misses']} misses, {store.stats['bytes_saved']} bytes saved)")
+    stats["proxies"] = proxy_videos(props, local_props, local, base_url, display_scale)
+    stats["images"] = presize_images(props, local_props, local, base_url, display_scale)
+    return local_props, server, stats
+
+# 7. Result Cache (canonical payload hash -> stored artifacts)
+RESULT_CACHE_DIR = "/results/_cache"
+# Defaults applied by CineVideo.tsx / Root.tsx when a field is absent
+PROPS_DEFAULTS = {"fps": 30, "backgroundMusicVolume": 0.1, "audioDucking": True}
+
+def canonical_value(value):
+    if isinstance(value, dict):
+        return {k: canonical_value(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [canonical_value(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def normalize_props(props):
+    p = canonical_value(props)
+    p.pop("selectedShortIndex", None)
+    for key, default in PROPS_DEFAULTS.items():
+        p.setdefault(key, default)
+    scenes = p.get("scenes", [])
+    for i, scene in enumerate(scenes):
+        # A transition on the last scene is ignored by both Root.tsx and CineVideo.tsx
+        if i == len(scenes) - 1:
+            scene["transitionAfter"] = "none"
+        scene.setdefault("transitionAfter", "none")
+        # Still drives each Scene's own opacity/audio fade, even without a transition
+        scene["transitionDuration"] = scene.get("transitionDuration") or 1
+    for short in p.get("shorts", []):
+        short.setdefault("renderer", "ffmpeg")
+    return p
+
+def payload_hash(props, **options):
+    canonical = json.dumps({"props": normalize_props(props), "options": options}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+def load_cached_result(key):
+    # The entry is the original job's artifact manifest; it only counts while its files survive
+    try:
+        with open(f"{RESULT_CACHE_DIR}/{key}.json") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if not all(os.path.exists(f"/results/{a['path']}") for a in manifest["artifacts"]):
+        return None
+    return manifest
+
+def store_cached_result(key, manifest):
+    os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+    staging = f"{RESULT_CACHE_DIR}/{key}.{uuid.uuid4().hex[:8]}.partial"
+    with open(staging, "w") as f:
+        json.dump(manifest, f)
+    os.replace(staging, f"{RESULT_CACHE_DIR}/{key}.json")
+
+# 8. Incremental Scene Segments (edit-preview loop)
+SEGMENT_CACHE_DIR = "/results/_segments"
+
+def scene_segments(props, bundle):
+    # One segment per scene, [start of scene i, start of scene i+1) in composition frames, so each
+    # transition overlap belongs to the segment of the scene it leads into
+    fps = props.get("fps") or 30
+    scenes = props.get("scenes", [])
+    total, _ = composition_frames(props)
+    norm = normalize_props(props)
+    # Watermark and end screen animate on the absolute frame, covered by the range in the key
+    shared = {"bundle": bundle, "fps": fps, "watermark": norm.get("watermark"), "endScreen": norm.get("endScreen")}
+    if norm.get("endScreen"):
+        shared["totalDuration"] = sum(scene["durationInSeconds"] for scene in scenes)
+
+    # Where <TransitionSeries> really shows each scene (spring-measured overlaps)
+    offsets = scene_offsets(props)
+    spans = [(offset, offset + js_round(scene["durationInSeconds"] * fps)) for scene, offset in zip(scenes, offsets)]
+    segments = []
+    start = 0
+    for i in range(len(scenes)):
+        end = total if i == len(scenes) - 1 else min(total, offsets[i + 1])
+        if end > start:
+            # Every scene with a frame in the range: this one, plus its neighbours inside the overlaps
+            deps = [norm["scenes"][j] for j, (a, b) in enumerate(spans) if a < end and b > start]
+            key = json.dumps({**shared, "range": [start, end], "scenes": deps}, sort_keys=True, separators=(",", ":"))
+            segments.append({"scene": i, "start": start, "end": end - 1, "key": hashlib.sha256(key.encode()).hexdigest()[:32]})
+        start = max(start, end)
+    return segments
+
+def render_main_segments(job_id, bundle_path, digest, input_data, input_path, output, env, progress=None, workers=None, hls=None):
+    segments = scene_segments(input_data, digest)
+    paths = [f"{SEGMENT_CACHE_DIR}/{seg['key']}.mp4" for seg in segments]
+    os.makedirs(SEGMENT_CACHE_DIR, exist_ok=True)
+    results_volume.reload()
+    print(f"🧱 Render Main as {len(segments)} scene segments...")
+    rendered = render_ranges(job_id, bundle_path, input_data, input_path, output, env,
+                             [(seg["start"], seg["end"]) for seg in segments], paths, progress, workers, hls)
+    print(f"🧱 {len(segments) - rendered}/{len(segments)} segments reused")
+    return {"total": len(segments), "rendered": rendered, "reused": len(segments) - rendered}
+
+# 9. Static-scene Fast Path (one still per visual change instead of one capture per frame)
+# Anything that animates per frame (cine_model.is_static_scene) keeps the scene in Chromium
+STATIC_MIN_FRAMES = 60
+STATIC_MIN_SHARE = 0.3
+STILL_CONCURRENCY = 8
+
+def scene_change_points(scene, fps, a, b):
+    # Local frames in (a, b) where a motionless Scene still changes: the REC counter ticks every
+    # second, subtitles switch on/off at their bounds
+    points = {math.ceil(k * fps) for k in range(1, int(b / fps) + 2)}
+    for sub in scene.get("subtitles") or []:
+        points.add(math.ceil(sub["start"] * fps))
+        points.add(math.floor(sub["end"] * fps) + 1)
+    return sorted(p for p in points if a < p < b)
+
+def static_plan(props):
+    # -> [{"kind": "render"|"still", "start", "end" (exclusive), "stills": [absolute frames]}] or None
+    if props.get("watermark"):
+        return None  # the watermark pulses on every frame
+    fps = props.get("fps") or 30
+    scenes = props.get("scenes", [])
+    total, _ = composition_frames(props)
+    end_screen = props.get("endScreen")
+    dynamic_from = total
+    if end_screen:
+        dynamic_from = min(total, math.floor((sum(s["durationInSeconds"] for s in scenes) - end_screen["duration"]) * fps))
+
+    stills = []
+    for i, (scene, start) in enumerate(zip(scenes, scene_offsets(props))):
+        frames = js_round(scene["durationInSeconds"] * fps)
+        if is_static_scene(scene):
+            # Skip the Scene's own opacity fades and the spring-measured TransitionSeries overlaps
+            fade = js_round((scene.get("transitionDuration") or 1) * fps)
+            a = max(fade, transition_overlap(scenes, i - 1, fps) if i > 0 else 0)
+            b = min(frames - fade, frames - transition_overlap(scenes, i, fps), dynamic_from - start)
+            if b - a >= STATIC_MIN_FRAMES:
+                points = [a] + scene_change_points(scene, fps, a, b)
+                stills.append({"kind": "still", "start": start + a, "end": start + b, "stills": [start + p for p in points]})
+
+    if sum(p["end"] - p["start"] for p in stills) < STATIC_MIN_SHARE * total:
+        return None
+    pieces, cursor = [], 0
+    for piece in stills:
+        if piece["start"] > cursor:
+            pieces.append({"kind": "render", "start": cursor, "end": piece["start"]})
+        pieces.append(piece)
+        cursor = piece["end"]
+    if cursor < total:
+        pieces.append({"kind": "render", "start": cursor, "end": total})
+    return pieces
+
+@app.function(
+    image=remotion_image,
+    cpu=16,
+    memory=32768,
+    timeout=3600,
+    volumes={"/results": results_volume},
+    retries=0
+)
+def render_stills(job_id: str, bundle_path: str, props: dict, frames: list):
+    props_path = f"/tmp/{job_id}_stills_{frames[0]}.json"
+    out_dir = f"/results/{job_id}/stills"
+    os.makedirs(out_dir, exist_ok=True)
+    local_props, server, _ = prefetch_local(props)
+    with open(props_path, "w") as f:
+        json.dump(local_props, f)
+    env = remotion_env()
+
+    def still(frame):
+        out = f"/tmp/{job_id}_still_{frame}.jpeg"
+        subprocess.run([
+            REMOTION_BIN, "still", "CineVideo", out,
+            "--bundle", bundle_path, "--props", props_path,
+            "--frame", str(frame), "--image-format", "jpeg", "--log=error",
+            "--chromium-flags", CHROMIUM_FLAGS
+        ], check=True, env=env)
+        shutil.move(out, f"{out_dir}/frame_{frame:06d}.jpeg")
+        return f"{out_dir}/frame_{frame:06d}.jpeg"
+
+    print(f"🖼️ {len(frames)} stills from frame {frames[0]}...")
+    metrics = JobMetrics(job_id)
+    try:
+        with metrics.stage(f"stills_{frames[0]}", frames=len(frames)) as stage:
+            with ThreadPoolExecutor(STILL_CONCURRENCY) as pool:
+                paths = list(pool.map(still, frames))
+            stage["outputs"] += paths
+        results_volume.commit()
+        return {"paths": paths, "metrics": metrics.stages[0]}
+    finally:
+        server.shutdown()
+        if os.path.exists(props_path): os.remove(props_path)
+
+def assemble_pieces(pieces, output, audio_path, fps, tmp_prefix):
+    # Single encode: Chromium chunks and looped stills go through one concat filter
+    inputs, graph, lists = [], [], []
+    for k, piece in enumerate(pieces):
+        if piece["kind"] == "render":
+            inputs += ["-i", piece["path"]]
+        else:
+            list_path = f"{tmp_prefix}_stills_{k}.txt"
+            bounds = piece["stills"] + [piece["end"]]
+            with open(list_path, "w") as f:
+                for path, a, b in zip(piece["paths"], bounds, bounds[1:]):
+                    f.write(f"file '{path}'\nduration {(b - a) / fps:.6f}\n")
+                # The concat demuxer ignores the last entry's duration unless it is repeated
+                f.write(f"file '{piece['paths'][-1]}'\n")
+            inputs += ["-f", "concat", "-safe", "0", "-i", list_path]
+            lists.append(list_path)
+        graph.append(
+            f"[{k}:v]fps={fps},scale={MAIN_SIZE[0]}:{MAIN_SIZE[1]},format=yuv420p,setsar=1,"
+            f"trim=end_frame={piece['end'] - piece['start']},setpts=PTS-STARTPTS[p{k}]"
+        )
+    graph.append("".join(f"[p{k}]" for k in range(len(pieces))) + f"concat=n={len(pieces)}:v=1:a=0[v]")
+    try:
+        subprocess.run([
+            "ffmpeg", "-y", "-loglevel", "error", *inputs, "-i", audio_path,
+            "-filter_complex", ";".join(graph), "-map", "[v]", "-map", f"{len(pieces)}:a?",
+            "-r", str(fps), "-c:v", "libx264", "-crf", "18", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+            "-c:a", "copy", "-movflags", "+faststart", output
+        ], check=True)
+    finally:
+        for list_path in lists:
+            os.remove(list_path)
+
+def render_main_static(job_id, bundle_path, input_data, input_path, output, env, pieces, fps, workers=None):
+    still_pieces = [p for p in pieces if p["kind"] == "still"]
+    render_pieces = [p for p in pieces if p["kind"] == "render"]
+    print(f"🖼️ Render Main: {len(still_pieces)} static runs, {len(render_pieces)} Chromium ranges...")
+
+    audio_proc, audio_path = render_audio(job_id, bundle_path, input_path, env)
+    try:
+        still_calls = [render_stills.spawn(job_id, bundle_path, input_data, p["stills"]) for p in still_pieces]
+        rendered = render_chunk.starmap(
+            [(job_id, bundle_path, input_data, i, p["start"], p["end"] - 1) for i, p in enumerate(render_pieces)]
+        )
+        results = []
+        for piece, result in zip(render_pieces, rendered):
+            piece["path"] = result["path"]
+            results.append(result)
+        for piece, call in zip(still_pieces, still_calls):
+            result = call.get()
+            piece["paths"] = result["paths"]
+            results.append(result)
+        if workers is not None:
+            workers += [result["metrics"] for result in results]
+        if audio_proc.wait() != 0:
+            raise subprocess.CalledProcessError(audio_proc.returncode, "ffmpeg audio mixdown")
+
+        results_volume.reload()
+        assemble_pieces(pieces, output, audio_path, fps, f"/tmp/{job_id}")
+        shutil.rmtree(f"/results/{job_id}/chunks", ignore_errors=True)
+        shutil.rmtree(f"/results/{job_id}/stills", ignore_errors=True)
+    finally:
+        if audio_proc.poll() is None: audio_proc.kill()
+        if os.path.exists(audio_path): os.remove(audio_path)
+
+    static_frames = sum(p["end"] - p["start"] for p in still_pieces)
+    captures = sum(len(p["stills"]) for p in still_pieces)
+    return {"static_frames": static_frames, "still_captures": captures,
+            "browser_frames": sum(p["end"] - p["start"] for p in render_pieces) + captures}
+
+# 10. Artifact Manifest (files stay on the volume, callers stream them with scripts/download_artifacts.py)
+VOLUME_NAME = "remotion-results"
+
+def artifact_entry(path, kind="video"):
+    return {
+        "name": os.path.basename(path),
+        "path": os.path.relpath(path, "/results"),
+        "size": os.path.getsize(path),
+        "sha256": file_sha256(path),
+        "kind": kind,
+    }
+
+def write_manifest(job_dir, job_id, artifacts, job_info):
+    manifest = {"job_id": job_id, "volume": VOLUME_NAME, "artifacts": artifacts, "job": job_info}
+    with open(f"{job_dir}/manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+# 11. Warm Render Worker (one Chromium + served bundle per container, reused across jobs)
+SIDECAR_SOCKET = "/tmp/remotion-sidecar.sock"
+SIDECAR_STARTUP_TIMEOUT = 300
+sidecar = None  # set in RenderWorker containers; remotion_render routes through it
+
+class SidecarClient:
+    # Newline-delimited JSON over a unix socket to server/render-sidecar.ts, one request per connection
+    def __init__(self, bundle_path, socket_path=SIDECAR_SOCKET):
+        self.bundle_path = bundle_path
+        self.socket_path = socket_path
+        started = time.time()
+        self.proc = subprocess.Popen(
+            ["./node_modules/.bin/tsx", "server/render-sidecar.ts", bundle_path, socket_path], env=remotion_env()
+        )
+        while True:
+            try:
+                self.startup_ms = self.request({"type": "ping"})["startupMs"]
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if self.proc.poll() is not None:
+                    raise RuntimeError(f"Render sidecar exited with {self.proc.returncode}")
+                if time.time() - started > SIDECAR_STARTUP_TIMEOUT:
+                    self.close()
+                    raise TimeoutError("Render sidecar did not become ready")
+                time.sleep(0.5)
+        self.startup_seconds = round(time.time() - started, 2)
+
+    def request(self, payload, progress=None, stage=None):
+        # Progress lines ("Rendered 120/900", as the CLI prints them) precede the JSON reply
+        response = {}
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.socket_path)
+            sock.sendall(json.dumps(payload).encode() + b"\n")
+            with sock.makefile("r", encoding="utf-8") as lines:
+                def progress_lines():
+                    for line in lines:
+                        if line.startswith("{"):
+                            response.update(json.loads(line))
+                            return
+                        yield line
+                if progress:
+                    progress.track(progress_lines(), stage)
+                else:
+                    for _ in progress_lines():
+                        pass
+        if not response:
+            raise ConnectionError("Render sidecar closed the connection without a reply")
+        if not response["ok"]:
+            raise RuntimeError(f"Render sidecar: {response['error']}")
+        return response
+
+    def render(self, composition, output, props_path, concurrency, frames=None, muted=False, progress=None, stage=None):
+        with open(props_path) as f:
+            input_props = json.load(f)
+        return self.request({
+            "type": "render", "composition": composition, "outputLocation": output, "inputProps": input_props,
+            "concurrency": concurrency, "frameRange": list(frames) if frames else None, "muted": muted,
+            "progress": bool(progress),
+        }, progress, stage or composition)
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            self.proc.wait(timeout=30)
+
+@app.cls(
     image=remotion_image,
     cpu=32,
     memory=65536,
     timeout=7200,
     volumes={"/results": results_volume},
-    retries=0 
+    scaledown_window=900,
+    retries=2  # render() runs render_video.local, so a retry resumes from state.json like render_video
 )
-def render_video(input_data: dict, upload_gdrive: bool = False):
-    job_id = f"job_{int(time.time())}"
+class RenderWorker:
+    # Serves jobs whose whole main render runs in one container (submit() routes them here, see
+    # worker_job) and Chromium shorts
+    @modal.enter()
+    def start(self):
+        global sidecar
+        started = time.time()
+        bundle_path, digest, _ = ensure_bundle(remotion_env())
+        sidecar = SidecarClient(bundle_path)
+        self.startup = {"bundle_hash": digest, "seconds": round(time.time() - started, 2),
+                        "browser_and_server_ms": sidecar.startup_ms}
+        self.jobs_served = 0
+        print(f"🔥 Render worker warm in {self.startup['seconds']}s")
+
+    @modal.method()
+    def render(self, input_data: dict, **options):
+        self.jobs_served += 1
+        manifest = render_video.local(input_data, **options)
+        if attached_call(manifest):
+            return manifest
+        # Startup is paid once per container; later jobs report it as skipped
+        manifest["job"]["worker"] = {
+            "warm": self.jobs_served > 1, "jobs_served": self.jobs_served,
+            "startup": self.startup, "startup_cost_paid_seconds": 0 if self.jobs_served > 1 else self.startup["seconds"],
+        }
+        return manifest
+
+    @modal.method()
+    def short(self, job_id: str, bundle_path: str, props: dict, index: int):
+        # Same bundle path as the coordinator's ensure_bundle, so remotion_render takes the sidecar
+        self.jobs_served += 1
+        return render_short.local(job_id, bundle_path, props, index)
+
+    @modal.exit()
+    def stop(self):
+        if sidecar:
+            sidecar.close()
+
+# 12. Adaptive Concurrency (CPU, memory and composition cost instead of a fixed 24 tabs)
+# Tab budget and composition cost live in cine_model.py, shared with scripts/estimate_render.py
+PROBE_FRAMES_PER_TAB = 4
+PROBE_MIN_FRAMES = 900
+
+def visible_cpus():
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, int(int(quota) / int(period)))
+    except (FileNotFoundError, ValueError):
+        pass
+    return len(os.sched_getaffinity(0))
+
+def available_memory_mb():
+    meminfo = {}
+    with open("/proc/meminfo") as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            meminfo[key] = int(value.split()[0]) // 1024
+    available = meminfo["MemAvailable"]
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            limit = f.read().strip()
+        with open("/sys/fs/cgroup/memory.current") as f:
+            current = int(f.read())
+        if limit != "max":
+            available = min(available, (int(limit) - current) // (1024 * 1024))
+    except (FileNotFoundError, ValueError):
+        pass
+    return available
+
+def pick_concurrency(props, cpus=None, memory_mb=None):
+    cpus = cpus or visible_cpus()
+    memory_mb = memory_mb or available_memory_mb()
+    cost = composition_cost(props)
+    return tab_concurrency(cpus, memory_mb, cost), {"cpus": cpus, "available_mb": memory_mb, "cost": cost}
+
+def probe_concurrency(job_id, bundle_path, props_path, env, candidate, total_frames):
+    # Renders a few frames per tab at the candidate setting and watches MemAvailable, then
+    # shrinks the candidate if the measured per-tab footprint would not fit at full size
+    frames = min(total_frames, PROBE_FRAMES_PER_TAB * candidate)
+    probe_out = f"/tmp/{job_id}_probe.mp4"
+    baseline = available_memory_mb()
+    lowest = baseline
+    stop = threading.Event()
+
+    def watch():
+        nonlocal lowest
+        while not stop.wait(0.25):
+            lowest = min(lowest, available_memory_mb())
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    started = time.time()
+    try:
+        remotion_render("CineVideo", probe_out, bundle_path, props_path, env, concurrency=candidate,
+                        frames=(0, frames - 1), muted=True)
+    finally:
+        stop.set()
+        watcher.join()
+        if os.path.exists(probe_out): os.remove(probe_out)
+
+    seconds = time.time() - started
+    per_tab_mb = max(1, (baseline - lowest) / candidate)
+    fits = max(1, int(baseline * MEMORY_HEADROOM / per_tab_mb))
+    probe = {"frames": frames, "seconds": round(seconds, 2), "fps": round(frames / seconds, 2), "per_tab_mb": round(per_tab_mb)}
+    return min(candidate, fits), probe
+
+# 13. Stage Metrics (wall time, throughput, Chromium memory, bytes written)
+METRICS_DIR = "/results/_metrics"  # one document per job: concurrent commits of one shared file lose lines
+RSS_SAMPLE_SECONDS = 0.5
+
+def process_tree_rss_mb(root_pid=None):
+    # Sum of RSS over every descendant of this process (remotion CLI, Chromium, ffmpeg, sidecar)
+    root_pid = root_pid or os.getpid()
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (FileNotFoundError, ProcessLookupError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total, stack = 0, list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        stack += children.get(pid, [])
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total / (1024 * 1024)
+
+class JobMetrics:
+    def __init__(self, job_id, progress=None):
+        self.job_id = job_id
+        self.progress = progress
+        self.started = time.time()
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, frames=0):
+        # The yielded record can be updated inside the block ("frames", "outputs")
+        record = {"stage": name, "frames": frames, "outputs": []}
+        peak = 0.0
+        stop = threading.Event()
+
+        def sample():
+            nonlocal peak
+            while True:
+                peak = max(peak, process_tree_rss_mb())
+                if stop.wait(RSS_SAMPLE_SECONDS):
+                    break
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        started = time.time()
+        if self.progress:
+            self.progress.publish({"stage": name, "phase": "started"})
+        try:
+            yield record
+        finally:
+            stop.set()
+            sampler.join()
+            wall = time.time() - started
+            outputs = record.pop("outputs")
+            record.update({
+                "wall_seconds": round(wall, 3),
+                "fps": round(record["frames"] / wall, 2) if record["frames"] and wall else None,
+                "peak_rss_mb": round(peak, 1),
+                "bytes_written": sum(os.path.getsize(p) for p in outputs if os.path.exists(p)),
+            })
+            self.stages.append(record)
+            if self.progress:
+                self.progress.publish({"stage": name, "phase": "finished", "wall_seconds": record["wall_seconds"]})
+
+    def document(self):
+        return {"job_id": self.job_id, "started_at": self.started,
+                "wall_seconds": round(time.time() - self.started, 3), "stages": self.stages}
+
+    def write_log(self, document):
+        # Named by job and start time, so a re-render of the same job id keeps both runs
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = f"{METRICS_DIR}/{self.job_id}_{int(self.started)}.json"
+        staging = f"{path}.{uuid.uuid4().hex[:8]}.partial"
+        with open(staging, "w") as f:
+            json.dump(document, f)
+        os.replace(staging, path)
+        results_volume.commit()
+
+# 14. Live Progress (Modal Dict keyed by job id and call id; scripts/poll_progress.py reads it)
+PROGRESS_DICT = "remotion-progress"
+PROGRESS_HISTORY = 200
+PROGRESS_INTERVAL = 1.0
+PROGRESS_RE = re.compile(r"\b(Rendered|Encoded|Stitched)\D{0,20}?(\d+)\s*/\s*(\d+)")
+
+class FileProgressStore:
+    # Local stand-in for modal.Dict (get/put), one JSON file per key
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{hashlib.sha256(key.encode()).hexdigest()[:24]}.json")
+
+    def get(self, key, default=None):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return default
+
+    def put(self, key, value):
+        staging = f"{self._path(key)}.{uuid.uuid4().hex[:8]}"
+        with open(staging, "w") as f:
+            json.dump(value, f)
+        os.replace(staging, self._path(key))
+
+class ProgressChannel:
+    # publish() only enqueues; a background thread batches events into the store so a slow
+    # network write never stalls the reader draining Remotion's stdout
+    def __init__(self, keys, store=None):
+        self.keys = [k for k in keys if k]
+        self.store = store if store is not None else modal.Dict.from_name(PROGRESS_DICT, create_if_missing=True)
+        self.events = []
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def publish(self, event):
+        self.queue.put(dict(event, time=time.time()))
+
+    def _run(self):
+        done = False
+        while not done:
+            batch = [self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            done = None in batch
+            self.events = (self.events + [e for e in batch if e is not None])[-PROGRESS_HISTORY:]
+            try:
+                for key in self.keys:
+                    self.store.put(key, self.events)
+            except Exception as e:
+                print(f"⚠️ Progress publish failed: {e}")
+
+    def track(self, stream, stage):
+        started, last = time.time(), 0.0
+        for line in stream:
+            match = PROGRESS_RE.search(line)
+            if not match:
+                print(line, end="")
+                continue
+            phase, frames, total = match.group(1).lower(), int(match.group(2)), int(match.group(3))
+            now = time.time()
+            if now - last < PROGRESS_INTERVAL and frames != total:
+                continue
+            last = now
+            fps = frames / max(now - started, 1e-6)
+            self.publish({"stage": stage, "phase": phase, "frames": frames, "total": total,
+                          "fps": round(fps, 2), "eta_seconds": round((total - frames) / fps, 1) if fps else None})
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+# 15. Seamless Loop (one closed-GOP cycle on the volume, the long video is a concat reference list)
+LOOP_CROSSFADE = 1.0  # seconds of audio overlapped at the seam
+LOOP_GOP_SECONDS = 2
+
+def loop_cycle_frames(total_frames, fps, crossfade=LOOP_CROSSFADE):
+    # The tail that is crossfaded into the head is dropped from the cycle so audio stays continuous
+    fade = min(js_round(crossfade * fps), total_frames // 4)
+    return total_frames - fade, fade
+
+def encode_loop_cycle(base_path, output, frames, fps):
+    # Closed GOP, IDR on frame 0: every repetition starts on a clean keyframe
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error", "-i", base_path, "-an", "-frames:v", str(frames),
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", "yuv420p",
+        "-g", str(fps * LOOP_GOP_SECONDS), "-flags", "+cgop", "-force_key_frames", "expr:eq(n,0)",
+        "-movflags", "+faststart", output
+    ], check=True)
+
+def mux_loop_audio(base_path, video_path, output, cycle_seconds, fade_seconds, crossfade):
+    # intro keeps the original opening; the repeating cycle mixes the dropped tail into its head
+    if crossfade:
+        graph = (f"[0:a]asplit=2[h][t];"
+                 f"[h]atrim=0:{cycle_seconds},asetpts=PTS-STARTPTS,afade=t=in:d={fade_seconds}[hd];"
+                 f"[t]atrim={cycle_seconds}:{cycle_seconds + fade_seconds},asetpts=PTS-STARTPTS,afade=t=out:d={fade_seconds}[tl];"
+                 f"[hd][tl]amix=inputs=2:duration=first:normalize=0[a]")
+    else:
+        graph = f"[0:a]atrim=0:{cycle_seconds},asetpts=PTS-STARTPTS[a]"
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error", "-i", base_path, "-i", video_path,
+        "-filter_complex", graph, "-map", "1:v", "-map", "[a]",
+        "-c:v", "copy", "-c:a", "aac", "-b:a", "192k", "-movflags", "+faststart", output
+    ], check=True)
+
+def loop_plan(intro, cycle, cycle_seconds, target_duration):
+    # [(part, seconds)]: the intro once, then the cycle until target_duration, the last one cut short
+    entries, remaining = [], target_duration
+    while remaining > 1e-6:
+        entries.append((intro if not entries else cycle, min(remaining, cycle_seconds)))
+        remaining -= cycle_seconds
+    return entries
+
+def write_loop_list(list_path, intro, cycle, cycle_seconds, target_duration):
+    # Relative entries so the list resolves both on the volume and next to downloaded parts
+    entries = loop_plan(intro, cycle, cycle_seconds, target_duration)
+    with open(list_path, "w") as f:
+        f.write("ffconcat version 1.0\n")
+        for part, seconds in entries:
+            f.write(f"file '{os.path.basename(part)}'\n")
+            if seconds < cycle_seconds:
+                f.write(f"outpoint {seconds:.6f}\n")
+    return len(entries)
+
+def build_seamless_loop(base_path, job_dir, total_frames, fps, target_duration):
+    cycle_frames, fade_frames = loop_cycle_frames(total_frames, fps)
+    cycle_seconds, fade_seconds = cycle_frames / fps, fade_frames / fps
+    video_path = f"/tmp/{os.path.basename(job_dir)}_cycle_video.mp4"
+    intro, cycle = f"{job_dir}/main_intro.mp4", f"{job_dir}/main_cycle.mp4"
+    list_path = f"{job_dir}/main_long.ffconcat"
+    try:
+        encode_loop_cycle(base_path, video_path, cycle_frames, fps)
+        if has_audio(base_path):
+            mux_loop_audio(base_path, video_path, intro, cycle_seconds, fade_seconds, crossfade=False)
+            mux_loop_audio(base_path, video_path, cycle, cycle_seconds, fade_seconds, crossfade=fade_frames > 0)
+        else:
+            shutil.copy(video_path, intro)
+            shutil.copy(video_path, cycle)
+    finally:
+        if os.path.exists(video_path): os.remove(video_path)
+    repeats = write_loop_list(list_path, intro, cycle, cycle_seconds, target_duration)
+    return list_path, [intro, cycle], {
+        "cycle_frames": cycle_frames, "cycle_seconds": cycle_seconds, "crossfade_frames": fade_frames,
+        "repeats": repeats, "duration": target_duration,
+    }
+
+def materialize_loop(list_path, output):
+    # Full-length copy, only for loop_mode="copy" or a client that wants a single file
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+        "-c", "copy", "-movflags", "+faststart", output
+    ], check=True)
+
+# 16. Video Proxies (trimmed, composition-sized, short-GOP copies that Chromium seeks cheaply)
+PROXY_CACHE_DIR = "/results/_proxies"
+PROXY_GOP = 10
+PROXY_CONCURRENCY = 4
+PROXY_VERSION = 1  # bump when the encode settings change
+
+def proxy_window(scene, fps):
+    # Frames of the source that <Video startFrom endAt> in Scene.tsx can show
+    playback = scene.get("videoPlayback") or {}
+    frames = js_round(scene["durationInSeconds"] * fps)
+    start = js_round(playback["startFrom"] * fps) if playback.get("startFrom") else 0
+    end = js_round(playback["endAt"] * fps) if playback.get("endAt") else frames
+    return start, max(end, start + 1)
+
+def proxy_key(source_hash, window, fps, size):
+    spec = {"source": source_hash, "window": window, "fps": fps, "size": size, "v": PROXY_VERSION}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:32]
+
+def encode_proxy(source, output, window, fps, size):
+    # Downscale only, keeping the aspect ratio so objectFit: cover frames it the same way
+    w, h = size
+    factor = f"min(1,max({w}/iw,{h}/ih))"
+    start, end = window
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error", "-i", source, "-an",
+        "-vf", f"fps={fps},trim=start_frame={start}:end_frame={end},setpts=PTS-STARTPTS,"
+               f"scale=w='trunc(iw*{factor}/2)*2':h='trunc(ih*{factor}/2)*2'",
+        "-r", str(fps), "-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-tune", "fastdecode", "-pix_fmt", "yuv420p",
+        "-g", str(PROXY_GOP), "-bf", "0", "-movflags", "+faststart", output
+    ], check=True)
+
+def proxy_videos(props, local_props, local, base_url, display_scale=1.0, cache_dir=ASSET_CACHE_DIR):
+    # Points each video scene of local_props at a proxy served from the same localhost server
+    fps = props.get("fps") or 30
+    size = [js_round(d * display_scale) for d in MAIN_SIZE]
+    started = time.time()
+    jobs, hashes = {}, {}
+    for scene, local_scene in zip(props.get("scenes", []), local_props.get("scenes", [])):
+        url = (scene.get("assets") or [None])[0]
+        if not url or url not in local or not VIDEO_RE.search(url):
+            continue
+        if url not in hashes:
+            hashes[url] = file_sha256(local[url])
+        window = proxy_window(scene, fps)
+        key = proxy_key(hashes[url], window, fps, size)
+        jobs.setdefault(key, (local[url], window))
+        # The proxy starts at the window, so the scene plays it from 0 for the same number of frames
+        local_scene["assets"] = [f"{base_url}/proxy_{key}.mp4"] + local_scene["assets"][1:]
+        local_scene["videoPlayback"] = dict(scene.get("videoPlayback") or {}, startFrom=0, endAt=(window[1] - window[0]) / fps)
+
+    stats = {"videos": len(jobs), "hits": 0, "encoded": 0}
+    if not jobs:
+        return stats
+
+    def build(key):
+        source, window = jobs[key]
+        shared, served = f"{PROXY_CACHE_DIR}/{key}.mp4", f"{cache_dir}/proxy_{key}.mp4"
+        if os.path.exists(served):
+            return "hits"
+        if os.path.exists(shared):
+            shutil.copyfile(shared, served)
+            return "hits"
+        tag = uuid.uuid4().hex[:8]
+        staging = f"{served}.{tag}.partial.mp4"
+        encode_proxy(source, staging, window, fps, size)
+        os.makedirs(PROXY_CACHE_DIR, exist_ok=True)
+        shutil.copyfile(staging, f"{shared}.{tag}.partial")
+        os.replace(f"{shared}.{tag}.partial", shared)
+        os.replace(staging, served)
+        return "encoded"
+
+    with ThreadPoolExecutor(PROXY_CONCURRENCY) as pool:
+        for outcome in pool.map(build, jobs):
+            stats[outcome] += 1
+    if stats["encoded"]:
+        results_volume.commit()
+    stats["seconds"] = round(time.time() - started, 2)
+    print(f"🎞️ Video proxies: {stats['encoded']} encoded, {stats['hits']} cached in {stats['seconds']}s")
+    return stats
+
+# 17. Image Pre-sizing (decode a display-sized JPEG per tab instead of a camera original)
+IMAGE_CACHE_DIR = "/results/_images"
+IMAGE_QUALITY = 92
+IMAGE_VERSION = 2  # bump when the resize/encode settings change
+
+def image_scale(scene):
+    # Largest transform scale Scene.tsx applies to the asset
+    kb = scene.get("kenBurns")
+    if kb is not None:
+        return max(kb.get("startScale") or 1.2, kb.get("endScale") or 1, 1)
+    return 1.2 if scene.get("zoomDirection") else 1
+
+def presize_image(source, output_base, target):
+    # Returns the written path, or None when the original is already as small and fast as it gets
+    from PIL import Image, ImageOps
+    with Image.open(source) as img:
+        source_format = img.format
+        # Chromium honours EXIF orientation, so bake it in before the tag is dropped, and size the
+        # displayed (rotated) dimensions, not the stored ones
+        img = ImageOps.exif_transpose(img)
+        factor = max(target[0] / img.width, target[1] / img.height)
+        if factor >= 1 and source_format in ("JPEG", "PNG"):
+            return None
+        if factor < 1:
+            img = img.resize((max(1, js_round(img.width * factor)), max(1, js_round(img.height * factor))), Image.LANCZOS)
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            output = f"{output_base}.png"
+            img.save(output, "PNG", compress_level=1)
+        else:
+            output = f"{output_base}.jpg"
+            img.convert("RGB").save(output, "JPEG", quality=IMAGE_QUALITY, progressive=False)
+    return output
+
+def presize_images(props, local_props, local, base_url, display_scale=1.0, cache_dir=ASSET_CACHE_DIR):
+    # One variant per source URL at the largest size any scene shows it
+    started = time.time()
+    targets = {}
+    for scene in props.get("scenes", []):
+        url = (scene.get("assets") or [None])[0]
+        if not url or url not in local or VIDEO_RE.search(url):
+            continue
+        scale = image_scale(scene) * display_scale
+        targets[url] = max(targets.get(url, 0), scale)
+
+    stats = {"images": len(targets), "resized": 0, "hits": 0, "kept": 0}
+    if not targets:
+        return stats
+
+    def build(url):
+        size = [js_round(d * targets[url]) for d in MAIN_SIZE]
+        spec = {"source": file_sha256(local[url]), "size": size, "v": IMAGE_VERSION}
+        key = hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:32]
+        for ext in (".jpg", ".png", ".keep"):
+            shared = f"{IMAGE_CACHE_DIR}/{key}{ext}"
+            if os.path.exists(shared):
+                if ext == ".keep":
+                    return url, None, "kept", False
+                served = f"{cache_dir}/presized_{key}{ext}"
+                if not os.path.exists(served):
+                    shutil.copyfile(shared, served)
+                return url, served, "hits", False
+
+        tag = uuid.uuid4().hex[:8]
+        os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        written = presize_image(local[url], f"{cache_dir}/presized_{key}.{tag}", size)
+        # A marker records originals that need no work so the next job skips the decode
+        ext = os.path.splitext(written)[1] if written else ".keep"
+        staging = f"{IMAGE_CACHE_DIR}/{key}{ext}.{tag}.partial"
+        if written:
+            shutil.copyfile(written, staging)
+        else:
+            open(staging, "w").close()
+        os.replace(staging, f"{IMAGE_CACHE_DIR}/{key}{ext}")
+        if not written:
+            return url, None, "kept", True
+        served = f"{cache_dir}/presized_{key}{ext}"
+        os.replace(written, served)
+        return url, served, "resized", True
+
+    with ThreadPoolExecutor(PREFETCH_CONCURRENCY) as pool:
+        results = list(pool.map(build, targets))
+
+    served_map = {}
+    for url, served, outcome, _ in results:
+        stats[outcome] += 1
+        if served:
+            served_map[url] = f"{base_url}/{os.path.basename(served)}"
+    for scene, local_scene in zip(props.get("scenes", []), local_props.get("scenes", [])):
+        url = (scene.get("assets") or [None])[0]
+        if url in served_map:
+            local_scene["assets"] = [served_map[url]] + local_scene["assets"][1:]
+    if any(wrote for *_, wrote in results):
+        results_volume.commit()
+    stats["seconds"] = round(time.time() - started, 2)
+    print(f"🖼️ Images: {stats['resized']} resized, {stats['hits']} cached, {stats['kept']} kept in {stats['seconds']}s")
+    return stats
+
+# 18. Rendition Ladder (one decode of the master, one split branch per rendition)
+RENDITIONS = {
+    "1080p": {"height": 1080, "video_bitrate": "5000k", "audio_bitrate": "192k"},
+    "720p": {"height": 720, "video_bitrate": "2800k", "audio_bitrate": "128k"},
+    "480p": {"height": 480, "video_bitrate": "1400k", "audio_bitrate": "96k"},
+}
+
+def rendition_specs(props):
+    # "outputs": ["720p", {"name": "360p", "height": 360, "video_bitrate": "800k"}, ...]
+    specs = []
+    for output in props.get("outputs") or []:
+        if isinstance(output, str):
+            if output not in RENDITIONS:
+                raise ValueError(f"Unknown rendition {output!r}, expected one of {sorted(RENDITIONS)}")
+            spec = dict(RENDITIONS[output], name=output)
+        else:
+            output = {k: v for k, v in output.items() if v is not None}
+            output["height"] = even_dimension(output["height"])  # libx264 rejects odd sizes
+            name = output.get("name") or f"{output['height']}p"
+            spec = dict(RENDITIONS.get(name, {"video_bitrate": "2000k", "audio_bitrate": "128k"}), **output, name=name)
+        spec["width"] = even_dimension(spec["height"] * MAIN_SIZE[0] / MAIN_SIZE[1])
+        # Raises here, before the render, instead of in derive_renditions after it
+        bitrate_bps(spec["video_bitrate"])
+        bitrate_bps(spec["audio_bitrate"])
+        specs.append(spec)
+    return list({spec["name"]: spec for spec in specs}.values())
+
+def derive_renditions(main_path, renditions, fps):
+    # renditions: [(spec, output_path)]
+    n = len(renditions)
+    with_audio = has_audio(main_path)
+    graph = [f"[0:v]split={n}" + "".join(f"[r{i}]" for i in range(n))]
+    outputs = []
+    for i, (spec, output) in enumerate(renditions):
+        graph.append(f"[r{i}]scale={spec['width']}:{spec['height']}:flags=lanczos,setsar=1[v{i}]")
+        rate = spec["video_bitrate"]
+        outputs += ["-map", f"[v{i}]", "-r", str(fps), "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+                    "-b:v", rate, "-maxrate", rate, "-bufsize", str(2 * bitrate_bps(rate))]
+        if with_audio:
+            outputs += ["-map", "0:a", "-c:a", "aac", "-b:a", spec["audio_bitrate"]]
+        outputs += ["-movflags", "+faststart", output]
+
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error", "-i", main_path,
+        "-filter_complex", ";".join(graph), *outputs
+    ], check=True)
+
+def rendition_entry(path, spec, seconds):
+    entry = artifact_entry(path, kind="rendition")
+    entry.update({
+        "rendition": spec["name"], "width": spec["width"], "height": spec["height"],
+        "video_bitrate": bitrate_bps(spec["video_bitrate"]), "audio_bitrate": bitrate_bps(spec["audio_bitrate"]),
+        "measured_bitrate": int(entry["size"] * 8 / seconds) if seconds else None,
+    })
+    return entry
+
+# 19. HLS Output (fMP4 segments + playlist on the volume; the EVENT playlist grows as chunks land)
+HLS_SEGMENT_SECONDS = 6
+HLS_AUDIO_BITRATE = "320k"  # same as the mixdown
+
+def package_hls(source, hls_dir, playlist="index.m3u8", duration=None, playlist_type="vod", audio=None, audio_offset=0.0):
+    # Stream copy into fMP4 segments; with audio, a muted chunk gets its slice of the mixdown
+    os.makedirs(hls_dir, exist_ok=True)
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", "-i", source]
+    streams = ["-map", "0", "-c", "copy"]
+    if audio:
+        cmd += ["-ss", f"{audio_offset:.6f}", "-i", audio]
+        streams = ["-map", "0:v", "-map", "1:a?", "-c:v", "copy", "-c:a", "aac", "-b:a", HLS_AUDIO_BITRATE]
+    if duration:
+        cmd += ["-t", f"{duration:.6f}"]
+    subprocess.run(cmd + streams + [
+        "-f", "hls", "-hls_time", str(HLS_SEGMENT_SECONDS),
+        "-hls_segment_type", "fmp4", "-hls_fmp4_init_filename", "init.mp4",
+        "-hls_segment_filename", f"{hls_dir}/seg_%05d.m4s", "-hls_playlist_type", playlist_type,
+        "-hls_flags", "independent_segments", f"{hls_dir}/{playlist}"
+    ], check=True)
+
+def write_hls_playlist(path, occurrences, pieces, playlist_type="VOD", ended=True):
+    # occurrences: piece names in play order, each its own init.mp4 behind a discontinuity
+    segments = [seconds for name in occurrences for seconds, _ in pieces[name]]
+    target = math.ceil(max(segments, default=HLS_SEGMENT_SECONDS))
+    lines = ["#EXTM3U", "#EXT-X-VERSION:7", f"#EXT-X-TARGETDURATION:{target}", "#EXT-X-MEDIA-SEQUENCE:0",
+             f"#EXT-X-PLAYLIST-TYPE:{playlist_type}", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    for n, name in enumerate(occurrences):
+        if n:
+            lines.append("#EXT-X-DISCONTINUITY")
+        lines.append(f'#EXT-X-MAP:URI="{name}/init.mp4"')
+        for seconds, uri in pieces[name]:
+            lines += [f"#EXTINF:{seconds:.6f},", f"{name}/{uri}"]
+    if ended:
+        lines.append("#EXT-X-ENDLIST")
+    # Players poll an EVENT playlist, so never let them read a half-written one
+    staging = f"{path}.{uuid.uuid4().hex[:8]}"
+    with open(staging, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(staging, path)
+
+def hls_finished(playlist_path):
+    if not os.path.exists(playlist_path):
+        return False
+    with open(playlist_path) as f:
+        return "#EXT-X-ENDLIST" in f.read()
+
+class HlsEventPlaylist:
+    # Live main.m3u8 over the main render: every committed chunk (already its own MP4) becomes a
+    # piece c0000/, c0001/, ... and the playlist is rewritten over the contiguous prefix of finished
+    # pieces and committed, so playback starts while later chunks are still rendering
+    def __init__(self, hls_dir, fps, playlist="main.m3u8"):
+        self.hls_dir = hls_dir
+        self.fps = fps
+        self.playlist = playlist
+        self.ranges = []
+        self.audio = None
+        self.pieces = {}
+
+    def attach(self, ranges, audio_proc, audio_path):
+        # The renderer's chunk ranges and its background mixdown, which each piece takes a slice of
+        self.ranges = ranges
+        self.audio = (audio_proc, audio_path)
+
+    def add(self, index, chunk_path):
+        if index in self.pieces:
+            return
+        audio_proc, audio_path = self.audio
+        if audio_proc.wait() != 0:
+            raise subprocess.CalledProcessError(audio_proc.returncode, "ffmpeg audio mixdown")
+        name = f"c{index:04d}"
+        piece_dir = f"{self.hls_dir}/{name}"
+        # A retried job keeps the pieces an earlier attempt committed
+        if not os.path.exists(f"{piece_dir}/index.m3u8"):
+            start, end = self.ranges[index]
+            staging = f"{piece_dir}.{uuid.uuid4().hex[:8]}.partial"
+            package_hls(chunk_path, staging, duration=(end - start + 1) / self.fps, audio=audio_path, audio_offset=start / self.fps)
+            os.replace(staging, piece_dir)
+        self.pieces[index] = hls_segments(f"{piece_dir}/index.m3u8")
+        self.write(ended=False)
+        results_volume.commit()
+
+    def complete(self):
+        return bool(self.ranges) and len(self.pieces) == len(self.ranges)
+
+    def write(self, ended):
+        ready = []
+        for index in range(len(self.ranges)):
+            if index not in self.pieces:
+                break
+            ready.append(index)
+        if ready:
+            write_hls_playlist(f"{self.hls_dir}/{self.playlist}", [f"c{i:04d}" for i in ready],
+                               {f"c{i:04d}": self.pieces[i] for i in ready}, playlist_type="EVENT", ended=ended)
+
+    def finish(self):
+        self.write(ended=True)
+        results_volume.commit()
+        return {"pieces": len(self.pieces), "segments": sum(len(segments) for segments in self.pieces.values()), "live": True}
+
+def hls_segments(playlist_path):
+    # [(seconds, uri)] from a media playlist written by package_hls
+    segments, seconds = [], None
+    with open(playlist_path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("#EXTINF:"):
+                seconds = float(line[8:].split(",")[0])
+            elif line and not line.startswith("#") and seconds is not None:
+                segments.append((seconds, line))
+                seconds = None
+    return segments
+
+def package_hls_loop(intro, cycle, cycle_seconds, target_duration, hls_dir):
+    # Intro and cycle are segmented once; the playlist repeats the cycle's segments by reference
+    # with a discontinuity per repetition, so an 8-hour stream stores one cycle
+    pieces, occurrences = {}, []
+    for part, seconds in loop_plan(intro, cycle, cycle_seconds, target_duration):
+        name = "intro" if part == intro else "cycle"
+        if seconds < cycle_seconds - 1e-6:
+            name, duration = f"{name}_tail", seconds
+        else:
+            duration = None
+        if name not in pieces:
+            package_hls(part, f"{hls_dir}/{name}", duration=duration)
+            pieces[name] = hls_segments(f"{hls_dir}/{name}/index.m3u8")
+        occurrences.append(name)
+
+    write_hls_playlist(f"{hls_dir}/main.m3u8", occurrences, pieces)
+    return {"pieces": len(pieces), "repeats": len(occurrences),
+            "segments": sum(len(pieces[name]) for name in occurrences)}
+
+def hls_entry(hls_dir, playlist="main.m3u8"):
+    # Parts keep their path relative to the playlist so a download can be served as-is
+    entry = artifact_entry(f"{hls_dir}/{playlist}", kind="hls")
+    entry["parts"] = []
+    for path in sorted(glob.glob(f"{hls_dir}/**/*", recursive=True)):
+        if os.path.isfile(path) and os.path.basename(path) != playlist:
+            part = artifact_entry(path, kind="hls_part")
+            part["name"] = os.path.relpath(path, hls_dir)
+            entry["parts"].append(part)
+    return entry
+
+# 20. Checkpoints (state.json + committed chunks in /results/{job_id}, so a retry resumes)
+def chunk_checkpoint(job_id, index):
+    return f"/results/{job_id}/chunks/chunk_{index:04d}.mp4"
+
+class JobState:
+    # steps: name -> {"artifacts", "info", "finished"}; only written once the step's files are committed
+    def __init__(self, job_dir, job_key):
+        self.path = f"{job_dir}/state.json"
+        try:
+            with open(self.path) as f:
+                self.data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.data = {"job_key": job_key, "steps": {}, "attempts": 0}
+        self.resumed = sorted(self.data["steps"])
+        self.data["attempts"] += 1
+        self.data["status"] = "running"
+        self.save()
+
+    def done(self, step, *paths):
+        return step in self.data["steps"] and all(os.path.exists(p) for p in paths)
+
+    def step(self, step):
+        return self.data["steps"].get(step, {"artifacts": [], "info": {}})
+
+    def complete(self, step, artifacts=(), info=None):
+        self.data["steps"][step] = {"artifacts": list(artifacts), "info": info or {}, "finished": time.time()}
+        self.save()
+
+    def finish(self, status, **extra):
+        self.data.update(extra, status=status)
+        self.save()
+
+    def save(self):
+        self.data["updated"] = time.time()
+        staging = f"{self.path}.{uuid.uuid4().hex[:8]}"
+        with open(staging, "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(staging, self.path)
+        results_volume.commit()
+
+def render_local_chunks(job_id, bundle_path, input_path, output, env, ranges, concurrency, progress=None, hls=None):
+    # Single-container render split into committed chunks; returns how many were rendered this attempt
+    audio_proc, audio_path = render_audio(job_id, bundle_path, input_path, env)
+    if hls:
+        hls.attach(ranges, audio_proc, audio_path)
+    paths = [chunk_checkpoint(job_id, i) for i in range(len(ranges))]
+    rendered = 0
+    try:
+        for i, (start, end) in enumerate(ranges):
+            if os.path.exists(paths[i]):
+                if hls:
+                    hls.add(i, paths[i])
+                continue
+            chunk_out = f"/tmp/{job_id}_chunk_{i}.mp4"
+            remotion_render("CineVideo", chunk_out, bundle_path, input_path, env, concurrency=concurrency,
+                            frames=(start, end), muted=True, progress=progress, stage=f"main_render[{i}]")
+            os.makedirs(os.path.dirname(paths[i]), exist_ok=True)
+            staging = f"{paths[i]}.{uuid.uuid4().hex[:8]}.partial"
+            shutil.move(chunk_out, staging)
+            os.replace(staging, paths[i])
+            results_volume.commit()
+            rendered += 1
+            if hls:
+                hls.add(i, paths[i])
+        if audio_proc.wait() != 0:
+            raise subprocess.CalledProcessError(audio_proc.returncode, "ffmpeg audio mixdown")
+        concat_copy(paths, output, audio_path)
+        shutil.rmtree(f"/results/{job_id}/chunks", ignore_errors=True)
+        return rendered
+    finally:
+        if audio_proc.poll() is None: audio_proc.kill()
+        if os.path.exists(audio_path): os.remove(audio_path)
+
+# 21. Job Identity (deterministic ids, atomic claims in a Modal Dict, attach instead of re-render)
+JOB_REGISTRY = "remotion-jobs"
+CLAIM_STALE_SECONDS = 3 * 7200 + 600  # render_video timeout x attempts, plus slack
+CLAIM_WAIT_SECONDS = 60
+
+def job_cache_key(input_data, shorts_mode="ffmpeg", loop_mode="reference", output_mode="mp4"):
+    # The bundle hash is part of the key so a deploy invalidates earlier results
+    options = {"loop_mode": loop_mode} if input_data.get("targetDuration") else {}
+    if output_mode != "mp4":
+        options["output_mode"] = output_mode
+    return payload_hash(input_data, bundle=bundle_hash(), shorts_mode=shorts_mode, **options)
+
+def job_id_for(key, nonce=None):
+    # Same key (idempotency key or payload hash) -> same job; a nonce forces a separate one
+    digest = hashlib.sha256(f"{key}|{nonce or ''}".encode()).hexdigest()
+    return f"job_{digest[:16]}"
+
+def job_registry():
+    return modal.Dict.from_name(JOB_REGISTRY, create_if_missing=True)
+
+def claimable(record):
+    # Failed, stale, or taken by a submitter that never got its call spawned
+    age = time.time() - record["claimed"]
+    return (record["status"] == "failed" or age > CLAIM_STALE_SECONDS
+            or (not record.get("call_id") and age > CLAIM_WAIT_SECONDS))
+
+def claim_job(job_id, call_id=None, registry=None):
+    # The volume has no cross-container atomic mkdir, so the claim is a put-if-absent on
+    # "{job_id}#{generation}"; a failed or stale claim is taken over with the next generation.
+    # Returns (claimed, current record).
+    registry = registry if registry is not None else job_registry()
+    record = registry.get(job_id)
+    if record and not claimable(record):
+        return False, record
+    generation = record["generation"] + 1 if record else 0
+    if not registry.put(f"{job_id}#{generation}", call_id, skip_if_exists=True):
+        return False, registry.get(job_id)
+    record = {"generation": generation, "status": "starting", "call_id": call_id, "claimed": time.time()}
+    registry.put(job_id, record)
+    return True, record
+
+def update_claim(job_id, registry=None, **fields):
+    registry = registry if registry is not None else job_registry()
+    record = registry.get(job_id) or {"generation": 0, "claimed": time.time()}
+    registry.put(job_id, dict(record, **fields, updated=time.time()))
+
+def attached_call(result):
+    # render_video that lost the claim returns a pointer instead of blocking its container
+    return (result or {}).get("attached_to", {}).get("call_id")
+
+def wait_result(call):
+    # Client-side get() that follows attach pointers to the owning call
+    result = call.get()
+    while attached_call(result):
+        result = modal.FunctionCall.from_id(attached_call(result)).get()
+    return result
+
+def worker_job(input_data, options):
+    # Whole main render on a warm RenderWorker's sidecar: below the fan-out threshold, not split into
+    # scene segments and without static runs (those spawn render_chunk / render_stills containers)
+    if options.get("incremental") or composition_frames(input_data)[0] >= FANOUT_MIN_FRAMES:
+        return False
+    return not (options.get("static_fast_path", True) and static_plan(input_data))
+
+def submit(input_data, job_key=None, nonce=None, registry=None, **options):
+    # Client-side entry: returns a FunctionCall, attaching to a render of the same job already in
+    # flight instead of starting a second container for it. The key is passed on so the container
+    # derives the same job id even if the local bundle differs from the deployed one.
+    if options.get("force") and not nonce:
+        nonce = uuid.uuid4().hex
+    key = job_key or job_cache_key(input_data, options.get("shorts_mode", "ffmpeg"),
+                                   options.get("loop_mode", "reference"), options.get("output_mode", "mp4"))
+    job_id = job_id_for(key, nonce)
+    registry = registry if registry is not None else job_registry()
+    deadline = time.time() + CLAIM_WAIT_SECONDS
+    while True:
+        claimed, record = claim_job(job_id, registry=registry)
+        if claimed:
+            try:
+                if worker_job(input_data, options):
+                    function = modal.Cls.from_name(app.name, "RenderWorker")().render
+                else:
+                    function = modal.Function.from_name(app.name, "render_video")
+                call = function.spawn(input_data, job_key=key, nonce=nonce, claimed=True, **options)
+            except Exception as e:
+                # Release the claim, otherwise every submit of this job waits on a call that never existed
+                update_claim(job_id, registry, status="failed", error=str(e))
+                raise
+            update_claim(job_id, registry, status="running", call_id=call.object_id)
+            print(f"🚀 Submitted {job_id} ({call.object_id})")
+            return call
+        if record and record.get("call_id"):
+            print(f"🔗 Attached to {job_id} ({record['status']}, {record['call_id']})")
+            return modal.FunctionCall.from_id(record["call_id"])
+        # Claimed by a submitter that is still spawning its call
+        if time.time() > deadline:
+            raise TimeoutError(f"{job_id} is claimed but no render was started")
+        time.sleep(1)
+
+# Main entrypoint
+@app.function(
+    image=remotion_image,
+    cpu=32,
+    memory=65536,
+    timeout=7200,
+    volumes={"/results": results_volume},
+    retries=2  # retries resume from state.json, see JobState
+)
+def render_video(input_data: dict, upload_gdrive: bool = False, chunk_frames: int = CHUNK_FRAMES, shorts_mode: str = "ffmpeg",
+                 force: bool = False, incremental: bool = False, static_fast_path: bool = True, concurrency: int = None,
+                 loop_mode: str = "reference", output_mode: str = "mp4", job_key: str = None, nonce: str = None,
+                 claimed: bool = False):
+    # job_key is an idempotency key; without one the payload hash identifies the job. Retries keep
+    # the same FunctionCall id, so a forced render still resumes its own checkpoints.
+    call_id = modal.current_function_call_id()
+    cache_key = job_cache_key(input_data, shorts_mode, loop_mode, output_mode)
+    job_id = job_id_for(job_key or cache_key, nonce or (call_id if force else None))
     print(f"🟡 [START] {job_id}")
+
+    if not force:
+        results_volume.reload()
+    cached = None if force else load_cached_result(cache_key)
+    if cached:
+        print(f"♻️ Result cache hit {cache_key} (from {cached['job_id']})")
+        return dict(cached, job={
+            "job_id": job_id, "result_cache": {"key": cache_key, "hit": True, "source_job": cached["job_id"]}
+        })
     
+    # claimed=True: submit() already holds the claim for this call
+    registry = job_registry()
+    if not claimed:
+        won, record = claim_job(job_id, call_id, registry)
+        deadline = time.time() + CLAIM_WAIT_SECONDS + 5
+        while not won and not (record or {}).get("call_id") and time.time() < deadline:
+            # Another submitter is still spawning its call; past CLAIM_WAIT_SECONDS the claim is ours
+            time.sleep(1)
+            won, record = claim_job(job_id, call_id, registry)
+        if not won and not (record or {}).get("call_id"):
+            raise RuntimeError(f"{job_id} is claimed but no render was started")
+        if not won and record["call_id"] != call_id:
+            # Don't hold a 32-CPU container on get(): hand the caller the owning call (wait_result follows it)
+            print(f"🔗 {job_id} is already rendering in {record['call_id']}")
+            return {"job_id": job_id, "volume": VOLUME_NAME, "artifacts": [],
+                    "attached_to": {"call_id": record["call_id"], "status": record["status"]}}
+    update_claim(job_id, registry, status="running", call_id=call_id)
+
     job_dir = f"/results/{job_id}"
     os.makedirs(job_dir, exist_ok=True)
+    state = JobState(job_dir, job_key or cache_key)
+    if state.resumed:
+        print(f"⏯️ Resuming {job_id} (attempt {state.data['attempts']}), done: {', '.join(state.resumed)}")
     
     input_path = f"/tmp/{job_id}_input.json"
-    bundle_path = f"/tmp/{job_id}_bundle.js"
-    results_bytes = {}
-
-    with open(input_path, "w") as f:
-        json.dump(input_data, f)
+    main_base_output = f"{job_dir}/main_base.mp4"  # checkpointed; removed once every artifact exists
+    artifacts = []
+    short_calls = {}
+    asset_server = None
+    job_info = {"job_id": job_id, "result_cache": {"key": cache_key, "hit": False},
+                "checkpoint": {"attempt": state.data["attempts"], "resumed_steps": state.resumed}}
+    for step in state.resumed:
+        job_info.update(state.step(step)["info"])
 
-    env = os.environ.copy()
-    env["REMOTION_LOG"] = "error" 
-    env["REMOTION_IGNORE_MEMORY_LIMIT_CHECK"] = "true"
+    env = remotion_env()
+    progress = ProgressChannel([job_id, modal.current_function_call_id()])
+    metrics = JobMetrics(job_id, progress)
     
     try:
-        # 1. BUNDLE
-        subprocess.run(["./node_modules/.bin/remotion", "bundle", "remotion/index.ts", bundle_path, "--log=error"], check=True, env=env)
+        # Fail on a bad "outputs" entry before anything is rendered
+        renditions = [(spec, f"{job_dir}/main_{spec['name']}.mp4") for spec in rendition_specs(input_data)]
 
-        # 2. RENDER MAIN
-        main_base_output = f"/tmp/{job_id}_main_base.mp4"
-        print(f"🚀 Render Main...")
-        subprocess.run([
-            "./node_modules/.bin/remotion", "render", "CineVideo", main_base_output,
-            "--bundle", bundle_path, "--props", input_path,
-            "--concurrency", "24", "--log=error",
-            "--chromium-flags", "--no-sandbox --disable-setuid-sandbox --disable-dev-shm-usage --disable-gpu"
-        ], check=True, env=env)
+        # 0. PREFETCH remote assets once; Chromium reads them from localhost
+        with metrics.stage("asset_fetch"):
+            local_props, asset_server, job_info["prefetch"] = prefetch_local(input_data)
+            with open(input_path, "w") as f:
+                json.dump(local_props, f)
+
+        # 1. BUNDLE (cached per source hash)
+        with metrics.stage("bundle"):
+            bundle_path, digest, cache_hit = ensure_bundle(env)
+        job_info["bundle"] = {"hash": digest, "cache_hit": cache_hit}
+
+        # Shorts that need Chromium render in their own containers alongside the main render
+        shorts_config = input_data.get("shorts", [])
+        derived = [i for i, short in enumerate(shorts_config)
+                   if shorts_mode == "ffmpeg" and short.get("renderer", "ffmpeg") == "ffmpeg"]
+        short_paths = {i: f"{job_dir}/short_{i+1}.mp4" for i in range(len(shorts_config))}
+        short_calls = {i: RenderWorker().short.spawn(job_id, bundle_path, input_data, i)
+                       for i in range(len(shorts_config)) if i not in derived and not os.path.exists(short_paths[i])}
 
-        # 3. HYBRID LOOP
+        # 2. RENDER MAIN (skipped when a previous attempt already produced the main output)
+        total_frames, fps = composition_frames(input_data)
+        static_pieces = static_plan(input_data) if static_fast_path and not incremental else None
         target_duration = input_data.get("targetDuration")
-        if target_duration:
-            main_final_path = f"{job_dir}/main_long.mp4"
-            print(f"🔄 Looping...")
-            subprocess.run([
-                "ffmpeg", "-y", "-stream_loop", "-1", "-i", main_base_output,
-                "-t", str(target_duration), "-c", "copy", "-map_metadata", "0", main_final_path
-            ], check=True)
-            # Long videos are NOT returned as bytes (limit overflow), they stay in Volume
-            results_bytes["main_long_info.txt"] = f"Long video saved to results volume: {main_final_path}".encode()
-            os.remove(main_base_output)
-        else:
-            # Short base videos ARE returned as bytes for Artifacts
-            with open(main_base_output, "rb") as f:
-                results_bytes["main.mp4"] = f.read()
-            os.remove(main_base_output)
+        hls_dir = f"{job_dir}/hls"
+        # Chunked renders publish a playable EVENT playlist as they go (the static path packages at the end)
+        live_hls = HlsEventPlaylist(hls_dir, fps) if output_mode == "hls" and not target_duration else None
+        if not state.done("main_output") and not state.done("main_render", main_base_output):
+            info, workers = {}, []
+            with metrics.stage("main_render", frames=total_frames) as stage:
+                stage["outputs"].append(main_base_output)
+                if incremental:
+                    info["segments"] = render_main_segments(job_id, bundle_path, digest, input_data, input_path, main_base_output, env, progress, workers, live_hls)
+                elif static_pieces:
+                    info["static"] = render_main_static(job_id, bundle_path, input_data, input_path, main_base_output, env, static_pieces, fps, workers)
+                elif total_frames >= FANOUT_MIN_FRAMES and total_frames > chunk_frames:
+                    rendered = render_main_fanout(job_id, bundle_path, input_data, input_path, main_base_output, env, total_frames, chunk_frames, progress, workers, live_hls)
+                    info["chunks"] = {"total": len(chunk_ranges(total_frames, chunk_frames)), "rendered": rendered}
+                else:
+                    chosen, info["concurrency"] = pick_concurrency(input_data)
+                    if concurrency:
+                        chosen = concurrency
+                    elif total_frames >= PROBE_MIN_FRAMES:
+                        chosen, info["concurrency"]["probe"] = probe_concurrency(job_id, bundle_path, input_path, env, chosen, total_frames)
+                    info["concurrency"]["chosen"] = chosen
+                    ranges = chunk_ranges(total_frames, chunk_frames)
+                    print(f"🚀 Render Main (concurrency {chosen}, {len(ranges)} checkpointed chunks)...")
+                    started = time.time()
+                    rendered = render_local_chunks(job_id, bundle_path, input_path, main_base_output, env, ranges, chosen, progress, live_hls)
+                    info["concurrency"]["fps"] = round(total_frames / (time.time() - started), 2)
+                    info["chunks"] = {"total": len(ranges), "rendered": rendered}
+                if "concurrency" not in info:
+                    # Rendered in other containers: the coordinator's peak_rss_mb only covers itself
+                    stage["workers"] = workers
+                    stage["worker_peak_rss_mb"] = max((w["peak_rss_mb"] for w in workers), default=None)
+            job_info.update(info)
+            state.complete("main_render", info=info)
+
+        # 3. MAIN OUTPUT: seamless loop (render once, repeat by reference), HLS or plain MP4
+        main_source = main_base_output if target_duration or output_mode == "hls" else f"{job_dir}/main.mp4"
+        if not state.done("main_output"):
+            info, outputs = {}, []
+            if target_duration and output_mode == "hls":
+                print(f"🔄 Looping to {target_duration}s as HLS...")
+                with metrics.stage("loop") as stage:
+                    list_path, parts, info["loop"] = build_seamless_loop(main_base_output, job_dir, total_frames, fps, target_duration)
+                    info["hls"] = package_hls_loop(*parts, info["loop"]["cycle_seconds"], target_duration, hls_dir)
+                    results_volume.commit()
+                    for path in parts + [list_path]:
+                        os.remove(path)
+                    stage["outputs"] += [p for p in glob.glob(f"{hls_dir}/**/*", recursive=True) if os.path.isfile(p)]
+                outputs.append(hls_entry(hls_dir))
+            elif target_duration:
+                print(f"🔄 Looping to {target_duration}s ({loop_mode})...")
+                with metrics.stage("loop") as stage:
+                    list_path, parts, info["loop"] = build_seamless_loop(main_base_output, job_dir, total_frames, fps, target_duration)
+                    stage["outputs"] += parts
+                    if loop_mode == "copy":
+                        materialize_loop(list_path, f"{job_dir}/main_long.mp4")
+                        stage["outputs"].append(f"{job_dir}/main_long.mp4")
+                # Long videos are flagged so clients don't download them by default
+                if loop_mode == "copy":
+                    outputs.append(artifact_entry(f"{job_dir}/main_long.mp4", kind="long"))
+                else:
+                    long_entry = artifact_entry(list_path, kind="long")
+                    long_entry["parts"] = [artifact_entry(part, kind="loop_part") for part in parts]
+                    outputs.append(long_entry)
+            elif output_mode == "hls":
+                with metrics.stage("hls", frames=total_frames) as stage:
+                    if live_hls and live_hls.complete():
+                        print(f"📡 Closing the live HLS playlist...")
+                        info["hls"] = live_hls.finish()
+                    elif hls_finished(f"{hls_dir}/main.m3u8"):
+                        info["hls"] = {"segments": len(hls_segments(f"{hls_dir}/main.m3u8")), "live": True}
+                    else:
+                        # Static path, or a retry after the main render: package the finished master
+                        print(f"📡 Packaging HLS...")
+                        shutil.rmtree(hls_dir, ignore_errors=True)
+                        package_hls(main_base_output, hls_dir, playlist="main.m3u8", playlist_type="event")
+                        results_volume.commit()
+                        info["hls"] = {"segments": len(hls_segments(f"{hls_dir}/main.m3u8"))}
+                    stage["outputs"] += [p for p in glob.glob(f"{hls_dir}/**/*", recursive=True) if os.path.isfile(p)]
+                outputs.append(hls_entry(hls_dir))
+            else:
+                os.replace(main_base_output, main_source)
+                outputs.append(artifact_entry(main_source))
+            job_info.update(info)
+            state.complete("main_output", outputs, info)
+        artifacts += state.step("main_output")["artifacts"]
         
-        # 4. SHORTS
-        shorts_config = input_data.get("shorts", [])
-        for i, short in enumerate(shorts_config):
-            short_out = f"/tmp/{job_id}_short_{i}.mp4"
-            short_props_path = f"/tmp/{job_id}_short_{i}.json"
-            
-            s_props = input_data.copy()
-            s_props["selectedShortIndex"] = i
-            with open(short_props_path, "w") as f:
-                json.dump(s_props, f)
-
-            print(f"🎬 Short {i+1}...")
-            subprocess.run([
-                "./node_modules/.bin/remotion", "render", "ShortsVideo", short_out,
-                "--bundle", bundle_path, "--props", short_props_path,
-                "--concurrency", "24", "--log=error",
-                "--chromium-flags", "--no-sandbox --disable-setuid-sandbox --disable-dev-shm-usage --disable-gpu"
-            ], check=True, env=env)
-            
-            with open(short_out, "rb") as f:
-                results_bytes[f"short_{i+1}.mp4"] = f.read()
-            
-            os.remove(short_out)
-            os.remove(short_props_path)
+        # 4. SHORTS (cut from the main render; Chromium ones were spawned after the bundle)
+        todo = [i for i in derived if not os.path.exists(short_paths[i])]
+        if todo:
+            print(f"✂️ Cutting {len(todo)} shorts from main...")
+            short_frames = sum(max(1, js_round((shorts_config[i]["endInSeconds"] - shorts_config[i]["startInSeconds"]) * fps))
+                               for i in todo)
+            with metrics.stage("shorts_ffmpeg", frames=short_frames) as stage:
+                # Written to staging names so a crash never leaves a truncated short that looks finished
+                staged = {i: f"{short_paths[i]}.partial.mp4" for i in todo}
+                derive_shorts(main_source, [(shorts_config[i], staged[i]) for i in todo], fps)
+                for i in todo:
+                    os.replace(staged[i], short_paths[i])
+                stage["outputs"] += [short_paths[i] for i in todo]
+            results_volume.commit()
+        job_info["shorts"] = {"derived": len(derived), "rendered": len(shorts_config) - len(derived)}
 
-        results_volume.commit()
+        # 5. RENDITIONS (payload "outputs"; from main.mp4, or from the base render, one composition pass,
+        #    when looping or packaging HLS)
+        if renditions and not state.done("renditions", *[path for _, path in renditions]):
+            print(f"📐 Encoding {len(renditions)} renditions...")
+            with metrics.stage("renditions", frames=total_frames * len(renditions)) as stage:
+                derive_renditions(main_source, renditions, fps)
+                stage["outputs"] += [path for _, path in renditions]
+            state.complete("renditions", [rendition_entry(path, spec, total_frames / fps) for spec, path in renditions])
+        artifacts += state.step("renditions")["artifacts"]
+
+        for i, call in short_calls.items():
+            result = call.get()
+            short_paths[i] = result["path"]
+            metrics.stages.append(result["metrics"])
+
+        # Publish our own writes before picking up the short containers' commits
+        with metrics.stage("volume_commit"):
+            results_volume.commit()
+            results_volume.reload()
+        artifacts += [artifact_entry(short_paths[i]) for i in sorted(short_paths)]
+
+        manifest = write_manifest(job_dir, job_id, artifacts, job_info)
+        store_cached_result(cache_key, manifest)
+        manifest["metrics"] = metrics.document()
+        manifest["metrics"].update(features=render_features(input_data), resumed=bool(state.resumed),
+                                   container={"cpus": visible_cpus()})
+        with open(f"{job_dir}/metrics.json", "w") as f:
+            json.dump(manifest["metrics"], f, indent=2)
+        if os.path.exists(main_base_output): os.remove(main_base_output)
+        state.finish("done")
+        update_claim(job_id, registry, status="done", manifest=f"{job_id}/manifest.json")
+        metrics.write_log(manifest["metrics"])
+        progress.publish({"stage": "job", "phase": "finished", "manifest": f"{job_id}/manifest.json"})
         print(f"🏁 DONE {job_id}")
-        return results_bytes
+        return manifest
 
     except Exception as e:
         print(f"❌ Error: {str(e)}")
+        progress.publish({"stage": "job", "phase": "failed", "error": str(e)})
+        # Checkpoints stay on the volume for the retry; Chromium shorts are re-spawned if unfinished
+        state.finish("failed", error=str(e))
+        update_claim(job_id, registry, status="failed", error=str(e))
+        for call in short_calls.values():
+            call.cancel()
         raise e
     finally:
+        progress.close()
+        if asset_server: asset_server.shutdown()
         if os.path.exists(input_path): os.remove(input_path)
-        if os.path.exists(bundle_path): os.remove(bundle_path)
@@ -1,34 +1,12 @@
 import React from 'react';
 import { AbsoluteFill, Audio, Img, interpolate, useCurrentFrame } from 'remotion';
 import { TransitionSeries } from '@remotion/transitions';
-import { fade } from '@remotion/transitions/fade';
-import { slide } from '@remotion/transitions/slide';
-import { wipe } from '@remotion/transitions/wipe';
-import { flip } from '@remotion/transitions/flip';
-import { clockWipe } from '@remotion/transitions/clock-wipe';
-import { springTiming, linearTiming } from '@remotion/transitions';
-import { TransitionPresentation, TransitionTiming } from '@remotion/transitions';
 import { Scene } from './Scene';
 import { EndScreen } from './EndScreen';
-import { CineVideoProps, TransitionType } from './schema';
+import { CineVideoProps } from './schema';
+import { getTransitionEffect } from './transitions';
 import { staticFile } from 'remotion';
 
-// eslint-disable-next-line @typescript-eslint/no-explicit-any
-const getTransitionEffect = (type: TransitionType = 'fade', durationInSeconds: number, fps: number, width: number, height: number): { presentation: TransitionPresentation<any>, timing: TransitionTiming } | null => {
-    const durationInFrames = Math.round(durationInSeconds * fps);
-    const timing = springTiming({ config: { damping: 200, mass: 1.5, stiffness: 50 } });
-
-    switch (type) {
-        case 'slide': return { presentation: slide({ direction: 'from-right' }), timing };
-        case 'wipe': return { presentation: wipe({ direction: 'from-right' }), timing };
-        case 'flip': return { presentation: flip({ direction: 'from-right' }), timing };
-        case 'clockWipe': return { presentation: clockWipe({ width, height }), timing: linearTiming({ durationInFrames }) };
-        case 'none': return null;
-        case 'fade':
-        default: return { presentation: fade(), timing };
-    }
-};
-
 export const CineVideo: React.FC<CineVideoProps> = ({
     scenes, backgroundMusic, backgroundMusicVolume = 0.1, fps = 30, audioDucking = true, watermark, endScreen
 }) => {
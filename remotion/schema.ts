@@ -143,8 +143,20 @@ export const ShortsConfigSchema = z.object({
     endInSeconds: z.number(),
     title: z.string().optional(),
     description: z.string().optional(),
+    renderer: z.enum(['ffmpeg', 'chromium']).optional(), // 'chromium' re-renders ShortsVideo (vertical-only overlays)
 });
 
+// Rendition ladder: a preset name or a custom height/bitrate
+export const OutputRenditionSchema = z.union([
+    z.enum(['1080p', '720p', '480p']),
+    z.object({
+        name: z.string().optional(),
+        height: z.number().int().positive(),
+        video_bitrate: z.string().optional(),
+        audio_bitrate: z.string().optional(),
+    }),
+]);
+
 export const CineVideoSchemaBase = z.object({
     scenes: z.array(SceneSchema),
     backgroundMusic: z.string().nullable().optional(),
@@ -158,6 +170,7 @@ export const CineVideoSchemaBase = z.object({
     selectedShortIndex: z.number().optional(), // New: Optimization for rendering a specific short
     data: z.any().optional(),
     targetDuration: z.number().optional(), // New: Total video duration in seconds (for looping)
+    outputs: z.array(OutputRenditionSchema).optional(), // Extra renditions encoded from the master in one pass
 });
 
 export const CineVideoSchema = z.union([
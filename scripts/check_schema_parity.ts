@@ -0,0 +1,151 @@
+import fs from 'fs';
+import path from 'path';
+import { execFileSync } from 'child_process';
+import { z } from 'zod';
+import { CineVideoSchema, CineVideoSchemaBase } from '../remotion/schema';
+
+// Keeps scripts/validate_payload.py in lockstep with remotion/schema.ts: the structural
+// descriptions must match exactly, and both validators must agree on every request and on
+// a set of edge cases.
+
+type Node = Record<string, unknown>;
+
+const python = process.env.PYTHON || 'python3';
+const script = path.join(process.cwd(), 'scripts', 'validate_payload.py');
+
+const describe = (schema: z.ZodTypeAny): Node => {
+    const def = schema._def;
+    switch (def.typeName) {
+        case 'ZodOptional':
+            return { ...describe(def.innerType), optional: true };
+        case 'ZodNullable':
+            return { ...describe(def.innerType), nullable: true };
+        case 'ZodAny':
+            return { type: 'any' };
+        case 'ZodString':
+            return { type: 'string' };
+        case 'ZodBoolean':
+            return { type: 'boolean' };
+        case 'ZodEnum':
+            return { type: 'enum', values: def.values };
+        case 'ZodArray':
+            return { type: 'array', items: describe(def.type) };
+        case 'ZodUnion':
+            return { type: 'union', options: def.options.map(describe) };
+        case 'ZodObject': {
+            const shape = (schema as z.AnyZodObject).shape;
+            const keys = Object.keys(shape).sort();
+            return { type: 'object', shape: Object.fromEntries(keys.map(k => [k, describe(shape[k])])) };
+        }
+        case 'ZodNumber': {
+            const node: Node = { type: 'number' };
+            for (const check of def.checks) {
+                if (check.kind === 'int') node.int = true;
+                if (check.kind === 'min') node.min = [check.value, check.inclusive];
+                if (check.kind === 'max') node.max = [check.value, check.inclusive];
+            }
+            return node;
+        }
+        default:
+            throw new Error(`No parity mapping for ${def.typeName}`);
+    }
+};
+
+// Key order inside a node is irrelevant; normalise before comparing
+const canonical = (value: unknown): unknown => {
+    if (Array.isArray(value)) return value.map(canonical);
+    if (value && typeof value === 'object') {
+        return Object.fromEntries(Object.keys(value).sort().map(k => [k, canonical((value as Node)[k])]));
+    }
+    return value;
+};
+
+const diff = (a: unknown, b: unknown, at: string, out: string[]) => {
+    if (JSON.stringify(canonical(a)) === JSON.stringify(canonical(b))) return;
+    if (a && b && typeof a === 'object' && typeof b === 'object' && !Array.isArray(a)) {
+        for (const key of new Set([...Object.keys(a), ...Object.keys(b as Node)])) {
+            diff((a as Node)[key], (b as Node)[key], at ? `${at}.${key}` : key, out);
+        }
+        return;
+    }
+    out.push(`  - ${at || 'root'}: zod=${JSON.stringify(a)} python=${JSON.stringify(b)}`);
+};
+
+const base = {
+    scenes: [{ assets: ['https://example.com/a.jpg'], durationInSeconds: 5 }],
+};
+
+// Payloads near the schema's edges, each expected to exercise one rule
+const edgeCases: unknown[] = [
+    base,
+    [base],
+    [],
+    {},
+    { ...base, fps: null },
+    { ...base, fps: '30' },
+    { ...base, backgroundMusic: null },
+    { ...base, audioDucking: 1 },
+    { ...base, unknownKey: true },
+    { ...base, data: { anything: [1, 'two'] } },
+    { ...base, outputs: ['720p', { height: 360 }] },
+    { ...base, outputs: ['1440p'] },
+    { ...base, outputs: [{ height: 0 }] },
+    { ...base, outputs: [{ height: 360.5 }] },
+    { ...base, watermark: { position: 'middle' } },
+    { ...base, watermark: { position: 'top-left', opacity: 1.5 } },
+    { ...base, shorts: [{ startInSeconds: 0 }] },
+    { ...base, shorts: [{ startInSeconds: 0, endInSeconds: 3, renderer: 'gpu' }] },
+    { ...base, endScreen: { text: 'Bye' } },
+    { scenes: [{ ...base.scenes[0], audio: null, kenBurns: { startScale: 2.5 } }] },
+    { scenes: [{ ...base.scenes[0], kenBurns: { rotation: -15, easing: 'ease-in-out' } }] },
+    { scenes: [{ ...base.scenes[0], videoPlayback: { startFrom: -1 } }] },
+    { scenes: [{ ...base.scenes[0], transitionAfter: 'dissolve' }] },
+    { scenes: [{ ...base.scenes[0], lowerThird: { name: 'A', title: 'B', showAt: 1 } }] },
+    { scenes: [{ ...base.scenes[0], progressBar: { from: 0, to: 1, duration: 2, showAt: 0 } }] },
+    { scenes: [{ ...base.scenes[0], chart: { type: 'bar', data: [{ label: 'x' }], showAt: 0, hideAt: 2 } }] },
+    { scenes: [{ ...base.scenes[0], subtitles: [{ start: 0, end: 1, text: 'hi' }, { start: 1 }] }] },
+    { scenes: [{ assets: 'a.jpg', durationInSeconds: 5 }] },
+    { scenes: [{ assets: [], durationInSeconds: 5 }] },
+];
+
+const main = () => {
+    let failed = false;
+
+    const expected = describe(CineVideoSchemaBase);
+    const actual = JSON.parse(execFileSync(python, [script, '--describe']).toString());
+    const differences: string[] = [];
+    diff(expected, actual, '', differences);
+    if (differences.length) {
+        console.error('❌ validate_payload.py does not match CineVideoSchemaBase:');
+        differences.forEach(line => console.error(line));
+        failed = true;
+    } else {
+        console.log('✅ Schema structure matches.');
+    }
+
+    const requestsDir = path.join(process.cwd(), 'requests');
+    const files = fs.existsSync(requestsDir) ? fs.readdirSync(requestsDir).filter(f => f.endsWith('.json')).sort() : [];
+    const cases = [
+        ...files.map(f => ({ name: `requests/${f}`, payload: JSON.parse(fs.readFileSync(path.join(requestsDir, f), 'utf-8')) })),
+        ...edgeCases.map((payload, i) => ({ name: `edge case ${i}`, payload })),
+    ];
+    const verdicts: boolean[] = JSON.parse(execFileSync(python, [script, '--schema-only-stdin'], {
+        input: JSON.stringify(cases.map(c => c.payload)),
+    }).toString());
+    cases.forEach((c, i) => {
+        const zod = CineVideoSchema.safeParse(c.payload).success;
+        if (zod !== verdicts[i]) {
+            console.error(`❌ ${c.name}: zod=${zod ? 'valid' : 'invalid'} python=${verdicts[i] ? 'valid' : 'invalid'}`);
+            failed = true;
+        }
+    });
+    if (!failed) {
+        console.log(`✅ Both validators agree on ${cases.length} payloads.`);
+    }
+
+    if (failed) {
+        process.exit(1);
+    }
+};
+
+main();
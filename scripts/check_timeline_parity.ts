@@ -0,0 +1,71 @@
+import fs from 'fs';
+import path from 'path';
+import { execFileSync } from 'child_process';
+import { CineVideoSchema, CineVideoProps } from '../remotion/schema';
+import { getTransitionEffect } from '../remotion/transitions';
+
+// Scene start frames as <TransitionSeries> lays them out in CineVideo (each transition pulls the
+// next sequence back by its timing's getDurationInFrames) must equal cine_model.scene_offsets,
+// which the ffmpeg audio mixdown, the static fast path and the scene segments place content by.
+
+const python = process.env.PYTHON || 'python3';
+
+const transitionSeriesOffsets = (props: CineVideoProps): number[] => {
+    const fps = props.fps || 30;
+    const offsets: number[] = [];
+    let start = 0;
+    props.scenes.forEach((scene, index) => {
+        offsets.push(start);
+        start += Math.round(scene.durationInSeconds * fps);
+        if (index < props.scenes.length - 1 && scene.transitionAfter && scene.transitionAfter !== 'none') {
+            const transition = getTransitionEffect(scene.transitionAfter, scene.transitionDuration || 1, fps, 1920, 1080);
+            if (transition) {
+                start -= transition.timing.getDurationInFrames({ fps });
+            }
+        }
+    });
+    return offsets;
+};
+
+const scene = (transitionAfter: string, durationInSeconds = 6, transitionDuration?: number) => ({
+    assets: ['https://example.com/a.jpg'], durationInSeconds, transitionAfter, transitionDuration,
+});
+
+// Every transition type at common frame rates, odd durations included
+const edgeCases: unknown[] = [24, 25, 30, 50, 60].flatMap(fps => [
+    { fps, scenes: ['fade', 'slide', 'wipe', 'flip', 'clockWipe', 'iris', 'none', 'fade'].map(t => scene(t)) },
+    { fps, scenes: [scene('clockWipe', 4.5, 1.5), scene('fade', 3.3, 0.4), scene('slide', 7, 2), scene('none')] },
+]);
+
+const main = () => {
+    const requestsDir = path.join(process.cwd(), 'requests');
+    const files = fs.existsSync(requestsDir) ? fs.readdirSync(requestsDir).filter(f => f.endsWith('.json')).sort() : [];
+    const cases = [
+        ...files.map(f => ({ name: `requests/${f}`, payload: JSON.parse(fs.readFileSync(path.join(requestsDir, f), 'utf-8')) })),
+        ...edgeCases.map((payload, i) => ({ name: `edge case ${i}`, payload })),
+    ].flatMap(c => {
+        const parsed = CineVideoSchema.safeParse(c.payload);
+        return parsed.success ? [{ name: c.name, props: parsed.data }] : [];
+    });
+
+    const script = 'import json, sys; from cine_model import scene_offsets; print(json.dumps([scene_offsets(p) for p in json.load(sys.stdin)]))';
+    const actual: number[][] = JSON.parse(execFileSync(python, ['-c', script], {
+        input: JSON.stringify(cases.map(c => c.props)),
+    }).toString());
+
+    let failed = false;
+    cases.forEach((c, i) => {
+        const expected = transitionSeriesOffsets(c.props);
+        if (JSON.stringify(expected) !== JSON.stringify(actual[i])) {
+            console.error(`❌ ${c.name}: TransitionSeries=${JSON.stringify(expected)} cine_model=${JSON.stringify(actual[i])}`);
+            failed = true;
+        }
+    });
+
+    if (failed) {
+        process.exit(1);
+    }
+    console.log(`✅ Scene offsets match <TransitionSeries> for ${cases.length} compositions.`);
+};
+
+main();
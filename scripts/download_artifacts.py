@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+def fetch(volume, artifact, save_path):
+    part_path = f"{save_path}.part"
+    digest = hashlib.sha256()
+    with open(part_path, "wb") as out:
+        for chunk in volume.read_file(artifact["path"]):
+            out.write(chunk)
+            digest.update(chunk)
+
+    if digest.hexdigest() != artifact["sha256"]:
+        os.remove(part_path)
+        raise ValueError(f"Checksum mismatch for {artifact['path']}")
+    os.replace(part_path, save_path)
+
+def materialize_loop(volume, artifact, dest_dir, prefix):
+    # Seamless loops are a concat list over one cycle; fetch the cycle once and copy-concat locally
+    work_dir = os.path.join(dest_dir, f".{prefix}loop")
+    os.makedirs(work_dir, exist_ok=True)
+    for part in artifact["parts"] + [artifact]:
+        fetch(volume, part, os.path.join(work_dir, part["name"]))
+    save_path = os.path.join(dest_dir, f"{prefix}{os.path.splitext(artifact['name'])[0]}.mp4")
+    subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+        "-i", os.path.join(work_dir, artifact["name"]), "-c", "copy", "-movflags", "+faststart", save_path
+    ], check=True)
+    shutil.rmtree(work_dir)
+    return save_path
+
+def download_hls(volume, artifact, dest_dir, prefix):
+    # Playlist and segments keep their relative layout; serve the folder over http to play it
+    hls_dir = os.path.join(dest_dir, f"{prefix}hls")
+    for part in artifact["parts"] + [artifact]:
+        save_path = os.path.join(hls_dir, part["name"])
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        fetch(volume, part, save_path)
+    print(f"📡 Play with: python -m http.server -d {hls_dir} 8000 -> http://localhost:8000/{artifact['name']}")
+    return os.path.join(hls_dir, artifact["name"])
+
+def download_artifacts(manifest, dest_dir="renders", prefix="", include_long=False, volume=None):
+    # Streams every artifact of a render_video manifest from the results volume to dest_dir
+    if volume is None:
+        import modal  # only the real volume needs Modal, render_requests --stub passes its own
+        volume = modal.Volume.from_name(manifest["volume"])
+    os.makedirs(dest_dir, exist_ok=True)
+    saved = []
+
+    for artifact in manifest["artifacts"]:
+        if artifact.get("kind") in ("long", "hls") and not include_long:
+            size = artifact["size"] + sum(part["size"] for part in artifact.get("parts", []))
+            print(f"🔗 Cloud Path: {manifest['volume']}:/{artifact['path']} ({size} bytes)")
+            continue
+
+        if artifact.get("kind") == "hls":
+            save_path = download_hls(volume, artifact, dest_dir, prefix)
+        elif artifact.get("parts"):
+            save_path = materialize_loop(volume, artifact, dest_dir, prefix)
+        else:
+            save_path = os.path.join(dest_dir, f"{prefix}{artifact['name']}")
+            fetch(volume, artifact, save_path)
+        saved.append(save_path)
+        print(f"✅ Saved: {save_path} ({os.path.getsize(save_path)} bytes)")
+
+    return saved
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python download_artifacts.py <manifest.json> [dest_dir] [--include-long]")
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        manifest = json.load(f)
+    dest = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith("--") else "renders"
+    download_artifacts(manifest, dest, include_long="--include-long" in sys.argv)
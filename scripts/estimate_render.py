@@ -0,0 +1,184 @@
+import json
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from cine_model import TAB_BASE_MB, composition_frames, js_round, render_features, tab_concurrency
+
+# Pure-Python render estimator: no Modal, no ffmpeg, runs in milliseconds.
+# Frame maths and features come from cine_model.py, the same code modal_app logs them with,
+# so weights can be fitted on the per-job documents in /results/_metrics/.
+
+FEATURES = ("frames", "motion_frames", "particle_frames", "chart_frames", "visualizer_frames",
+            "video_frames", "transition_frames", "shorts_frames")
+
+# Seconds per feature unit on the default 32-CPU render_video container, used until enough
+# history is available; "intercept" covers prefetch, bundle and container startup
+PRIOR_WEIGHTS = {
+    "intercept": 60.0, "frames": 0.01, "motion_frames": 0.025, "particle_frames": 0.02, "chart_frames": 0.01,
+    "visualizer_frames": 0.01, "video_frames": 0.05, "transition_frames": 0.02, "shorts_frames": 0.005,
+}
+PRIOR_STRENGTH = 5.0  # ridge pull towards the priors, in "jobs"
+MIN_HISTORY = 3
+
+BASE_MEMORY_MB = 1500  # coordinator, node and ffmpeg besides the tabs
+REFERENCE_CPUS = 32
+CHUNK_FRAMES = 1800
+FANOUT_MIN_FRAMES = 2 * CHUNK_FRAMES
+FUNCTION_SIZES = [(4, 8192), (8, 16384), (16, 32768), (32, 65536)]
+CHUNK_FUNCTION = (16, 32768)  # render_chunk's container
+TIMEOUT_SECONDS = 7200
+
+def unwrap(payload):
+    # CineVideoSchema also accepts a non-empty array and renders its first element
+    return payload[0] if isinstance(payload, list) else payload
+
+def video_metadata(props):
+    # calculateVideoMetadata: (durationInFrames, fps)
+    fps = props.get("fps") or 30
+    shorts = props.get("shorts") or []
+    index = props.get("selectedShortIndex")
+    if index is not None and 0 <= index < len(shorts):
+        short = shorts[index]
+        return max(1, js_round((short["endInSeconds"] - short["startInSeconds"]) * fps)), fps
+    return composition_frames(props)
+
+def memory_samples(doc, main):
+    # (peak RSS MB, cpus, memory MB) of each container that ran the main render's Chromium tabs.
+    # Fan-out jobs log their chunk containers under "workers"; stills workers don't run tabs.
+    if "workers" in main:
+        return [(w["peak_rss_mb"], *CHUNK_FUNCTION) for w in main["workers"]
+                if w["stage"].startswith("chunk_") and w.get("peak_rss_mb")]
+    if doc["features"].get("frames", 0) >= FANOUT_MIN_FRAMES or not main.get("peak_rss_mb"):
+        return []  # logged before worker metrics: the peak only covers the coordinator
+    return [(main["peak_rss_mb"], REFERENCE_CPUS, 65536)]
+
+def metrics_documents(path):
+    # The _metrics/ directory (one JSON per job), or a legacy _metrics.jsonl log
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if name.endswith(".json"))
+        texts = []
+        for name in names:
+            with open(os.path.join(path, name)) as f:
+                texts.append(f.read())
+    else:
+        try:
+            with open(path) as f:
+                texts = f.read().splitlines()
+        except FileNotFoundError:
+            return
+    for text in texts:
+        try:
+            yield json.loads(text)
+        except json.JSONDecodeError:
+            continue
+
+def load_history(path):
+    # Completed, fresh (not resumed, not cache hit) jobs from the metrics documents
+    jobs = []
+    for doc in metrics_documents(path):
+        stages = {stage["stage"]: stage for stage in doc.get("stages", [])}
+        if not doc.get("features") or "main_render" not in stages or doc.get("resumed"):
+            continue
+        if (doc.get("container") or {}).get("cpus", REFERENCE_CPUS) != REFERENCE_CPUS:
+            continue
+        jobs.append({"features": doc["features"], "seconds": doc["wall_seconds"],
+                     "memory": memory_samples(doc, stages["main_render"])})
+    return jobs
+
+def solve(matrix, vector):
+    # Gaussian elimination with partial pivoting; the system is len(FEATURES) + 1 wide
+    n = len(vector)
+    rows = [row[:] + [value] for row, value in zip(matrix, vector)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(n):
+            if r != col and rows[col][col]:
+                factor = rows[r][col] / rows[col][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [rows[i][n] / rows[i][i] if rows[i][i] else 0.0 for i in range(n)]
+
+def calibrate(history):
+    # Ridge regression towards PRIOR_WEIGHTS. Features are scaled to their mean so the prior
+    # strength means the same for frame counts and the intercept; weights stay non-negative
+    names = ("intercept",) + FEATURES
+    if len(history) < MIN_HISTORY:
+        return dict(PRIOR_WEIGHTS), {"jobs": len(history), "source": "priors"}
+    rows = [[1.0] + [float(job["features"].get(name, 0)) for name in FEATURES] for job in history]
+    scale = [max(sum(row[k] for row in rows) / len(rows), 1e-9) for k in range(len(names))]
+    x = [[value / scale[k] for k, value in enumerate(row)] for row in rows]
+    y = [job["seconds"] for job in history]
+    prior = [PRIOR_WEIGHTS[name] * scale[k] for k, name in enumerate(names)]
+    lam = PRIOR_STRENGTH * max(sum(v * v for row in x for v in row) / (len(x) * len(names)), 1e-9)
+    xtx = [[sum(row[i] * row[j] for row in x) + (lam if i == j else 0) for j in range(len(names))] for i in range(len(names))]
+    xty = [sum(row[i] * target for row, target in zip(x, y)) + lam * prior[i] for i in range(len(names))]
+    fitted = solve(xtx, xty)
+    weights = {name: max(0.0, fitted[k] / scale[k]) for k, name in enumerate(names)}
+    errors = [abs(predict_seconds(job["features"], weights) - job["seconds"]) / max(job["seconds"], 1) for job in history]
+    return weights, {"jobs": len(history), "source": "history", "mean_abs_error": round(sum(errors) / len(errors), 3)}
+
+def memory_factor(history):
+    # Observed / modelled peak RSS of the busiest render container per job, median over history
+    ratios = sorted(max(peak / peak_memory_mb(job["features"], cpus, memory_mb) for peak, cpus, memory_mb in job["memory"])
+                    for job in history if job.get("memory"))
+    return ratios[len(ratios) // 2] if len(ratios) >= MIN_HISTORY else 1.0
+
+def predict_seconds(feats, weights, cpus=REFERENCE_CPUS, memory_mb=65536):
+    # Frame work scales with the tabs the container can run relative to the reference size
+    work = sum(weights[name] * feats.get(name, 0) for name in FEATURES)
+    tabs = tab_concurrency(cpus, memory_mb, feats.get("cost", 1.0))
+    reference = tab_concurrency(REFERENCE_CPUS, 65536, feats.get("cost", 1.0))
+    return weights["intercept"] + work * reference / tabs
+
+def peak_memory_mb(feats, cpus, memory_mb, factor=1.0):
+    tabs = tab_concurrency(cpus, memory_mb, feats.get("cost", 1.0))
+    return (BASE_MEMORY_MB + tabs * TAB_BASE_MB * feats.get("cost", 1.0)) * factor
+
+def estimate(payload, history=None, max_seconds=TIMEOUT_SECONDS * 0.8):
+    props = unwrap(payload)
+    history = history or []
+    frames, fps = video_metadata(props)
+    feats = render_features(props)
+    weights, calibration = calibrate(history)
+    factor = memory_factor(history)
+
+    options = []
+    for cpus, memory_mb in FUNCTION_SIZES:
+        options.append({
+            "cpu": cpus, "memory": memory_mb,
+            "render_seconds": round(predict_seconds(feats, weights, cpus, memory_mb), 1),
+            "peak_memory_mb": round(peak_memory_mb(feats, cpus, memory_mb, factor)),
+        })
+    fitting = [o for o in options if o["render_seconds"] <= max_seconds and o["peak_memory_mb"] <= o["memory"]]
+    recommended = dict(fitting[0] if fitting else options[-1])
+    # Long compositions go through render_video's fan-out regardless of the coordinator size
+    recommended["fanout"] = frames >= FANOUT_MIN_FRAMES and frames > CHUNK_FRAMES
+    if recommended["fanout"]:
+        chunks = math.ceil(frames / CHUNK_FRAMES)
+        per_chunk = dict(feats, **{name: feats[name] / chunks for name in FEATURES})
+        # Coordinator overhead plus the slowest 16-CPU chunk container
+        recommended.update(chunks=chunks, render_seconds=round(
+            weights["intercept"] + predict_seconds(per_chunk, weights, 16, 32768), 1))
+
+    reference = next(o for o in options if o["cpu"] == REFERENCE_CPUS)
+    return {
+        "frames": frames, "fps": fps, "duration_seconds": round(frames / fps, 3),
+        "features": feats,
+        "render_seconds": recommended["render_seconds"] if recommended["fanout"] else reference["render_seconds"],
+        "peak_memory_mb": reference["peak_memory_mb"],
+        "recommended": recommended,
+        "options": options,
+        "calibration": calibration,
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python estimate_render.py <payload.json> [--metrics _metrics]")
+        print("       (fetch the documents with: modal volume get remotion-results _metrics)")
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        payload = json.load(f)
+    history = load_history(sys.argv[sys.argv.index("--metrics") + 1]) if "--metrics" in sys.argv else []
+    print(json.dumps(estimate(payload, history), indent=2))
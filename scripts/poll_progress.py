@@ -0,0 +1,41 @@
+import sys
+import time
+
+import modal
+
+PROGRESS_DICT = "remotion-progress"  # modal_app.PROGRESS_DICT
+
+def poll(job_id, store=None):
+    # Events published so far for a job id or the FunctionCall id returned by spawn()
+    store = store if store is not None else modal.Dict.from_name(PROGRESS_DICT)
+    return store.get(job_id, []) or []
+
+def describe(event):
+    if "total" in event and event.get("frames") is not None:
+        line = f"{event['stage']} {event['phase']} {event['frames']}/{event['total']}"
+        if event.get("fps"):
+            line += f" @ {event['fps']} fps, ETA {event['eta_seconds']}s"
+        return line
+    return f"{event['stage']} {event['phase']}"
+
+def watch(job_id, interval=2.0, store=None):
+    seen = 0
+    while True:
+        events = poll(job_id, store)
+        new = [e for e in events if e["time"] > seen]
+        for event in new:
+            print(f"📈 {describe(event)}")
+            seen = event["time"]
+        if any(e["stage"] == "job" and e["phase"] in ("finished", "failed") for e in new):
+            return events
+        time.sleep(interval)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python poll_progress.py <job_id|call_id> [--watch]")
+        sys.exit(1)
+    if "--watch" in sys.argv:
+        watch(sys.argv[1])
+    else:
+        for event in poll(sys.argv[1]):
+            print(f"📈 {describe(event)}")
@@ -0,0 +1,186 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from download_artifacts import download_artifacts
+from validate_payload import PayloadError, validate_payload
+
+# Batch driver for requests/*.json: validates every request, renders each distinct payload once,
+# keeps up to max_in_flight renders running and streams artifacts to renders/ in completion order.
+# Submissions go through modal_app.submit, so a job another run already has in flight is attached
+# to instead of rendered twice. Run with --stub to exercise it without Modal.
+
+MAX_IN_FLIGHT = 4
+
+def canonical(value):
+    # 5 and 5.0 are the same payload (modal_app.canonical_value)
+    if isinstance(value, dict):
+        return {k: canonical(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [canonical(v) for v in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def content_hash(props):
+    return hashlib.sha256(json.dumps(canonical(props), sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+def changed_requests(paths=None):
+    # Explicit paths, else the CI change list, else the newest request on a manual dispatch
+    if paths:
+        return paths
+    try:
+        paths = json.loads(os.getenv("CHANGED_FILES", "[]"))
+    except json.JSONDecodeError:
+        paths = []
+    if not paths and os.getenv("EVENT_NAME") == "workflow_dispatch":
+        paths = sorted(glob.glob("requests/*.json"), key=os.path.getmtime)[-1:]
+    return paths
+
+def load_jobs(paths):
+    # {content hash: {"props", "stems"}} in first-seen order; requests that fail validation are reported
+    jobs, invalid = {}, []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        stem = Path(path).stem
+        try:
+            with open(path) as f:
+                props = validate_payload(json.load(f))
+        except (json.JSONDecodeError, PayloadError) as e:
+            print(f"❌ Invalid request {path}, skipping render:")
+            for issue_path, message in getattr(e, "issues", [("", str(e))]):
+                print(f"  - [Path: {issue_path or 'root'}]: {message}")
+            invalid.append(path)
+            continue
+        job = jobs.setdefault(content_hash(props), {"props": props, "stems": []})
+        job["stems"].append(stem)
+        if len(job["stems"]) > 1:
+            print(f"♻️ {path} duplicates {job['stems'][0]}, rendering once")
+    return jobs, invalid
+
+def run_job(submit, wait, job, dest_dir, volume=None, **options):
+    # One render per distinct payload; duplicates get local copies of its artifacts
+    first, *others = job["stems"]
+    call = submit(job["props"], **options)
+    print(f"🚀 {first}: {call.object_id} (python scripts/poll_progress.py {call.object_id} --watch)")
+    manifest = wait(call)
+
+    saved = download_artifacts(manifest, dest_dir, prefix=f"{first}_", volume=volume)
+    for stem in job["stems"]:
+        with open(os.path.join(dest_dir, f"{stem}_manifest.json"), "w") as out:
+            json.dump(manifest, out, indent=2)
+    for stem in others:
+        for path in saved:
+            shutil.copyfile(path, os.path.join(dest_dir, f"{stem}_{os.path.basename(path)[len(first) + 1:]}"))
+    return manifest
+
+def render_requests(paths, submit, wait, dest_dir="renders", max_in_flight=MAX_IN_FLIGHT, volume=None, **options):
+    jobs, invalid = load_jobs(paths)
+    os.makedirs(dest_dir, exist_ok=True)
+    results = {"rendered": [], "failed": [], "invalid": invalid,
+               "duplicates": sum(len(job["stems"]) - 1 for job in jobs.values())}
+    if not jobs:
+        return results
+
+    started = time.time()
+    # Each worker holds one call from spawn to download, so workers bound the renders in flight
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight)) as pool:
+        futures = {pool.submit(run_job, submit, wait, job, dest_dir, volume, **options): job for job in jobs.values()}
+        for future in as_completed(futures):
+            stems = futures[future]["stems"]
+            try:
+                manifest = future.result()
+            except Exception as e:
+                print(f"❌ Error rendering {', '.join(stems)}: {e}")
+                results["failed"].extend(stems)
+                continue
+            print(f"🏁 {', '.join(stems)} done after {time.time() - started:.1f}s ({manifest['job_id']})")
+            results["rendered"].extend(stems)
+    return results
+
+# Local stand-in for modal_app.submit / wait_result, same call and manifest shapes
+class LocalVolume:
+    def __init__(self, root):
+        self.root = root
+
+    def read_file(self, path):
+        with open(os.path.join(self.root, path), "rb") as f:
+            while chunk := f.read(1 << 20):
+                yield chunk
+
+class LocalCall:
+    def __init__(self, future):
+        self.future = future
+        self.object_id = f"fc-local-{uuid.uuid4().hex[:12]}"
+
+    def get(self, timeout=None):
+        return self.future.result(timeout)
+
+class LocalRenderStub:
+    # Writes placeholder artifacts after a delay proportional to the scene count, so jobs
+    # finish out of submission order like real renders
+    def __init__(self, root, seconds_per_scene=0.05):
+        self.root = root
+        self.seconds_per_scene = seconds_per_scene
+        self.volume = LocalVolume(root)
+        self.pool = ThreadPoolExecutor(max_workers=32)
+        self.calls = []
+
+    def submit(self, input_data, **options):
+        self.calls.append(input_data)
+        return LocalCall(self.pool.submit(self.render, input_data, options))
+
+    def render(self, input_data, options):
+        time.sleep(self.seconds_per_scene * len(input_data["scenes"]))
+        job_id = f"job_{content_hash(input_data)[:16]}"
+        os.makedirs(os.path.join(self.root, job_id), exist_ok=True)
+        artifacts = []
+        # Same names render_video writes (shorts are numbered from 1)
+        names = ["main.mp4"] + [f"short_{i + 1}.mp4" for i in range(len(input_data.get("shorts", [])))]
+        for name in names:
+            path = os.path.join(job_id, name)
+            data = json.dumps({"job_id": job_id, "artifact": name, "options": options}).encode()
+            with open(os.path.join(self.root, path), "wb") as f:
+                f.write(data)
+            artifacts.append({"name": name, "path": path, "size": len(data),
+                              "sha256": hashlib.sha256(data).hexdigest(), "kind": "video"})
+        return {"job_id": job_id, "volume": "local", "artifacts": artifacts, "job": {"stub": True}}
+
+def option_value(name, default):
+    return type(default)(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+if __name__ == "__main__":
+    if "--help" in sys.argv:
+        print("Usage: python render_requests.py [request.json...] [--dest renders] [--max-in-flight 4] [--stub]")
+        print("       (without paths: $CHANGED_FILES, or the newest request on workflow_dispatch)")
+        sys.exit(0)
+    flags_with_values = {"--dest", "--max-in-flight"}
+    paths = [arg for i, arg in enumerate(sys.argv[1:], 1)
+             if not arg.startswith("--") and sys.argv[i - 1] not in flags_with_values]
+    paths = changed_requests(paths)
+    if not paths:
+        print("No changed requests to process.")
+        sys.exit(0)
+
+    volume = None
+    if "--stub" in sys.argv:
+        stub = LocalRenderStub(tempfile.mkdtemp(prefix="render-stub-"))
+        submit, wait, volume = stub.submit, LocalCall.get, stub.volume
+    else:
+        # modal_app (and cine_model) live at the repo root
+        sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+        from modal_app import submit, wait_result as wait
+
+    results = render_requests(paths, submit, wait, option_value("--dest", "renders"),
+                              option_value("--max-in-flight", MAX_IN_FLIGHT), volume=volume, upload_gdrive=False)
+    print(f"\n📦 {len(results['rendered'])} rendered, {len(results['failed'])} failed, "
+          f"{len(results['invalid'])} invalid, {results['duplicates']} duplicates")
@@ -0,0 +1,446 @@
+import json
+import math
+import os
+import sys
+from dataclasses import MISSING, dataclass, field, fields, is_dataclass
+from functools import lru_cache
+from typing import Any, List, Literal, Optional, Union, get_args, get_origin, get_type_hints
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from cine_model import bitrate_bps, composition_frames, even_dimension, js_round
+
+# Pure-Python mirror of CineVideoSchemaBase in remotion/schema.ts so the driver can reject a job
+# before any Modal container boots. Structure is kept in lockstep with the Zod schema by
+# scripts/check_schema_parity.ts; the render checks below cover what Zod accepts but Remotion
+# throws on (interpolate needs strictly increasing input ranges) or renders as nothing.
+
+def req(**checks):
+    return field(metadata=checks)
+
+def opt(default=None, **checks):
+    # Optional in Zod; a non-None default is the value the compositions fall back to
+    return field(default=default, metadata=checks)
+
+Transition = Literal["fade", "slide", "wipe", "flip", "clockWipe", "iris", "none"]
+ZoomDirection = Literal["in", "out", "left-to-right", "right-to-left"]
+
+@dataclass
+class KenBurns:
+    startX: Optional[float] = opt(ge=-100, le=100)
+    startY: Optional[float] = opt(ge=-100, le=100)
+    endX: Optional[float] = opt(ge=-100, le=100)
+    endY: Optional[float] = opt(ge=-100, le=100)
+    startScale: Optional[float] = opt(ge=1, le=2)
+    endScale: Optional[float] = opt(ge=1, le=2)
+    rotation: Optional[float] = opt(ge=-15, le=15)
+    easing: Optional[Literal["linear", "easeIn", "easeOut", "easeInOut", "ease-in", "ease-out", "ease-in-out"]] = opt()
+
+@dataclass
+class VideoPlayback:
+    startFrom: Optional[float] = opt(ge=0)
+    endAt: Optional[float] = opt(ge=0)
+    loop: Optional[bool] = opt()
+    muted: Optional[bool] = opt()
+    volume: Optional[float] = opt(ge=0, le=1)
+
+@dataclass
+class TitleCard:
+    text: str = req()
+    subtitle: Optional[str] = opt()
+    animation: Optional[Literal["slideUp", "slideDown", "fade", "zoom", "typewriter"]] = opt()
+    position: Optional[Literal["top", "center", "bottom"]] = opt()
+    showAt: Optional[float] = opt()
+    hideAt: Optional[float] = opt()
+
+@dataclass
+class Subtitle:
+    start: float = req()
+    end: float = req()
+    text: str = req()
+
+@dataclass
+class LowerThird:
+    name: str = req()
+    title: str = req()
+    showAt: float = req()
+    hideAt: float = req()
+
+@dataclass
+class ProgressBar:
+    to: float = req()
+    duration: float = req()
+    showAt: float = req()
+    label: Optional[str] = opt()
+    from_: Optional[float] = opt(key="from")
+    color: Optional[str] = opt()
+    position: Optional[Literal["top", "bottom"]] = opt()
+
+@dataclass
+class ParticleEffect:
+    type: Literal["confetti", "snow", "rain", "sparkles", "bubbles", "fireflies"] = req()
+    showAt: float = req()
+    hideAt: float = req()
+    count: Optional[float] = opt()
+    color: Optional[str] = opt()
+
+@dataclass
+class DataPoint:
+    label: str = req()
+    value: float = req()
+    color: Optional[str] = opt()
+
+@dataclass
+class Chart:
+    type: Literal["bar", "line", "pie", "donut"] = req()
+    data: List[DataPoint] = req()
+    showAt: float = req()
+    hideAt: float = req()
+    title: Optional[str] = opt()
+    position: Optional[Literal["left", "center", "right"]] = opt()
+
+@dataclass
+class AudioVisualizer:
+    type: Literal["bars", "wave", "circle", "dots"] = req()
+    color: Optional[str] = opt()
+    gap: Optional[float] = opt()
+    barWidth: Optional[float] = opt()
+    position: Optional[Literal["bottom", "center", "top", "bottom-right", "bottom-left"]] = opt()
+    opacity: Optional[float] = opt()
+
+@dataclass
+class Scene:
+    assets: List[str] = req()
+    durationInSeconds: float = req()
+    audio: Optional[str] = opt(nullable=True)
+    videoPlayback: Optional[VideoPlayback] = opt()
+    zoomDirection: Optional[ZoomDirection] = opt()
+    kenBurns: Optional[KenBurns] = opt()
+    titleCard: Optional[TitleCard] = opt()
+    subtitles: Optional[List[Subtitle]] = opt()
+    lowerThird: Optional[LowerThird] = opt()
+    progressBar: Optional[ProgressBar] = opt()
+    particles: Optional[ParticleEffect] = opt()
+    chart: Optional[Chart] = opt()
+    visualizer: Optional[AudioVisualizer] = opt()
+    transitionAfter: Optional[Transition] = opt("none")
+    transitionDuration: Optional[float] = opt(1)
+
+@dataclass
+class SocialLink:
+    platform: str = req()
+    url: str = req()
+
+@dataclass
+class EndScreen:
+    text: str = req()
+    duration: float = req()
+    callToAction: Optional[str] = opt()
+    socialLinks: Optional[List[SocialLink]] = opt()
+
+@dataclass
+class Watermark:
+    position: Literal["top-left", "top-right", "bottom-left", "bottom-right"] = req()
+    imageUrl: Optional[str] = opt()
+    text: Optional[str] = opt()
+    opacity: Optional[float] = opt(ge=0, le=1)
+    scale: Optional[float] = opt()
+
+@dataclass
+class ShortsConfig:
+    startInSeconds: float = req()
+    endInSeconds: float = req()
+    title: Optional[str] = opt()
+    description: Optional[str] = opt()
+    renderer: Optional[Literal["ffmpeg", "chromium"]] = opt("ffmpeg")
+
+@dataclass
+class OutputRenditionSpec:
+    height: int = req(gt=0)
+    name: Optional[str] = opt()
+    video_bitrate: Optional[str] = opt()
+    audio_bitrate: Optional[str] = opt()
+
+OutputRendition = Union[Literal["1080p", "720p", "480p"], OutputRenditionSpec]
+
+@dataclass
+class CineVideo:
+    scenes: List[Scene] = req()
+    backgroundMusic: Optional[str] = opt(nullable=True)
+    backgroundMusicVolume: Optional[float] = opt(0.1)
+    fps: Optional[float] = opt(30)
+    audioDucking: Optional[bool] = opt(True)
+    watermark: Optional[Watermark] = opt()
+    endScreen: Optional[EndScreen] = opt()
+    shorts: Optional[List[ShortsConfig]] = opt()
+    selectedShortIndex: Optional[float] = opt()
+    data: Optional[Any] = opt()
+    targetDuration: Optional[float] = opt()
+    outputs: Optional[List[OutputRendition]] = opt()
+
+class PayloadError(ValueError):
+    def __init__(self, issues):
+        self.issues = issues
+        super().__init__("; ".join(f"{path or 'root'}: {message}" for path, message in issues))
+
+@lru_cache(maxsize=None)
+def schema_fields(tp):
+    # (field, key, type) per dataclass; resolving hints on every object dominates parse time
+    hints = get_type_hints(tp)
+    return tuple((f, key_of(f), hints[f.name]) for f in fields(tp))
+
+def key_of(f):
+    return f.metadata.get("key", f.name)
+
+def type_name(value):
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    return {str: "string", list: "array", dict: "object"}.get(type(value), type(value).__name__)
+
+def join(path, key):
+    return f"{path}.{key}" if path else str(key)
+
+def parse(tp, value, path, issues, checks=None):
+    # Returns the parsed value; problems are appended to issues as (path, message) like Zod's
+    checks = checks or {}
+    origin = get_origin(tp)
+    if origin is Union and type(None) in get_args(tp):
+        tp = next(arg for arg in get_args(tp) if arg is not type(None))
+        origin = get_origin(tp)
+    if tp is Any:
+        return value
+    if origin is Union:
+        for option in get_args(tp):
+            attempt = []
+            parsed = parse(option, value, path, attempt)
+            if not attempt:
+                return parsed
+        issues.append((path, "Invalid input"))
+        return None
+    if origin is Literal:
+        if value not in get_args(tp) or isinstance(value, bool):
+            expected = " | ".join(f"'{v}'" for v in get_args(tp))
+            issues.append((path, f"Invalid enum value. Expected {expected}, received '{value}'"))
+        return value
+    if origin in (list, List):
+        if not isinstance(value, list):
+            issues.append((path, f"Expected array, received {type_name(value)}"))
+            return None
+        return [parse(get_args(tp)[0], item, join(path, i), issues) for i, item in enumerate(value)]
+    if is_dataclass(tp):
+        if not isinstance(value, dict):
+            issues.append((path, f"Expected object, received {type_name(value)}"))
+            return None
+        kwargs = {}
+        before = len(issues)
+        for f, key, hint in schema_fields(tp):
+            if key not in value:
+                if f.default is MISSING:
+                    issues.append((join(path, key), "Required"))
+                continue
+            if value[key] is None and f.metadata.get("nullable"):
+                kwargs[f.name] = None
+                continue
+            kwargs[f.name] = parse(hint, value[key], join(path, key), issues, f.metadata)
+        # Unknown keys are stripped, as Zod's default object parsing does
+        return tp(**kwargs) if len(issues) == before else None
+    if tp in (float, int):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or math.isnan(value):
+            issues.append((path, f"Expected number, received {type_name(value)}"))
+            return None
+        if tp is int and not float(value).is_integer():
+            issues.append((path, "Expected integer, received float"))
+        if "ge" in checks and value < checks["ge"]:
+            issues.append((path, f"Number must be greater than or equal to {checks['ge']}"))
+        if "gt" in checks and value <= checks["gt"]:
+            issues.append((path, f"Number must be greater than {checks['gt']}"))
+        if "le" in checks and value > checks["le"]:
+            issues.append((path, f"Number must be less than or equal to {checks['le']}"))
+        return value
+    expected = {str: "string", bool: "boolean"}[tp]
+    if type_name(value) != expected:
+        issues.append((path, f"Expected {expected}, received {type_name(value)}"))
+    return value
+
+def to_props(value):
+    # Dataclasses back to the camelCase dicts the compositions read; unset optionals are dropped
+    if is_dataclass(value):
+        return {key_of(f): to_props(getattr(value, f.name)) for f in fields(value) if getattr(value, f.name) is not None}
+    if isinstance(value, list):
+        return [to_props(v) for v in value]
+    return value
+
+def check_window(issues, path, show, hide, fps, ramp):
+    # Overlays fade over `ramp` frames at each end: interpolate([s, s+ramp, h-ramp, h]) throws
+    # unless the window is longer than both ramps
+    if show >= hide:
+        issues.append((path, f"showAt ({show}) must be before hideAt ({hide})"))
+    elif (hide - show) * fps <= 2 * ramp:
+        issues.append((path, f"showAt..hideAt must be longer than {round(2 * ramp / fps, 3)}s"))
+
+def check_render(video):
+    issues = []
+    fps = video.fps
+    if fps <= 0:
+        issues.append(("fps", "fps must be positive"))
+        return issues
+    if not video.scenes:
+        issues.append(("scenes", "At least one scene is required"))
+    for i, scene in enumerate(video.scenes):
+        path = f"scenes.{i}"
+        if not scene.assets or not all(asset.strip() for asset in scene.assets):
+            issues.append((f"{path}.assets", "Scene needs a non-empty asset"))
+        frames = js_round(scene.durationInSeconds * fps)
+        fade = js_round((scene.transitionDuration or 1) * fps)
+        # Scene.tsx fades over interpolate([0, fade, frames - fade, frames])
+        if fade < 1 or frames <= 2 * fade:
+            issues.append((f"{path}.durationInSeconds",
+                           f"{scene.durationInSeconds}s is too short for a {scene.transitionDuration or 1}s fade at each end"))
+        if scene.titleCard:
+            check_window(issues, f"{path}.titleCard", scene.titleCard.showAt or 0,
+                         scene.titleCard.hideAt or scene.durationInSeconds, fps, 15)
+        if scene.lowerThird:
+            check_window(issues, f"{path}.lowerThird", scene.lowerThird.showAt, scene.lowerThird.hideAt, fps, 20)
+        if scene.chart:
+            check_window(issues, f"{path}.chart", scene.chart.showAt, scene.chart.hideAt, fps, 15)
+        if scene.particles:
+            check_window(issues, f"{path}.particles", scene.particles.showAt, scene.particles.hideAt, fps, 0)
+        if scene.progressBar and scene.progressBar.duration * fps <= 20:
+            issues.append((f"{path}.progressBar.duration", f"duration must be longer than {round(20 / fps, 3)}s"))
+        for j, subtitle in enumerate(scene.subtitles or []):
+            if subtitle.start >= subtitle.end:
+                issues.append((f"{path}.subtitles.{j}", f"start ({subtitle.start}) must be before end ({subtitle.end})"))
+        playback = scene.videoPlayback
+        if playback and playback.endAt is not None and playback.endAt <= (playback.startFrom or 0):
+            issues.append((f"{path}.videoPlayback.endAt", "endAt must be after startFrom"))
+    if issues:
+        return issues
+
+    # calculateVideoMetadata in remotion/Root.tsx, on the props as the compositions receive them
+    total = composition_frames(to_props(video))[0]
+    duration = total / fps
+    for i, short in enumerate(video.shorts or []):
+        if short.startInSeconds < 0 or short.startInSeconds >= short.endInSeconds:
+            issues.append((f"shorts.{i}", f"startInSeconds ({short.startInSeconds}) must be in [0, endInSeconds)"))
+        elif js_round(short.endInSeconds * fps) > total:
+            issues.append((f"shorts.{i}.endInSeconds", f"{short.endInSeconds}s is past the end of the video ({round(duration, 3)}s)"))
+    if video.endScreen and not 0 < video.endScreen.duration <= duration:
+        issues.append(("endScreen.duration", f"duration must be in (0, {round(duration, 3)}]"))
+    if video.watermark and not (video.watermark.text or video.watermark.imageUrl):
+        issues.append(("watermark", "Watermark needs text or imageUrl"))
+    if video.targetDuration is not None and video.targetDuration <= 0:
+        issues.append(("targetDuration", "targetDuration must be positive"))
+    # modal_app.rendition_specs parses these before rendering; ffmpeg would fail after it
+    for i, output in enumerate(video.outputs or []):
+        for key in ("video_bitrate", "audio_bitrate"):
+            rate = getattr(output, key, None)
+            if rate is not None:
+                try:
+                    bitrate_bps(rate)
+                except ValueError as e:
+                    issues.append((f"outputs.{i}.{key}", str(e)))
+    return issues
+
+def parse_payload(payload, render_checks=True):
+    # CineVideoSchema: an object, or a non-empty array of which the first element is rendered
+    if isinstance(payload, list):
+        if not payload:
+            raise PayloadError([("", "Array must contain at least 1 element(s)")])
+        payload = payload[0]
+    issues = []
+    video = parse(CineVideo, payload, "", issues)
+    if not issues and render_checks:
+        issues = check_render(video)
+    if issues:
+        raise PayloadError(issues)
+    # Same canonical defaults as modal_app.normalize_props
+    for i, scene in enumerate(video.scenes):
+        scene.transitionDuration = scene.transitionDuration or 1
+        if i == len(video.scenes) - 1:
+            scene.transitionAfter = "none"
+    # rendition_specs rounds custom heights to even (libx264)
+    for output in video.outputs or []:
+        if isinstance(output, OutputRenditionSpec):
+            output.height = even_dimension(output.height)
+    return video
+
+def validate_payload(payload, render_checks=True):
+    # Normalised props dict, or PayloadError listing every (path, message)
+    return to_props(parse_payload(payload, render_checks))
+
+def describe(tp, checks=None):
+    # Structural description compared against the Zod schema by check_schema_parity.ts
+    checks = checks or {}
+    origin = get_origin(tp)
+    node = {}
+    if origin is Union and type(None) in get_args(tp):
+        tp = next(arg for arg in get_args(tp) if arg is not type(None))
+        origin = get_origin(tp)
+    if tp is Any:
+        node["type"] = "any"
+    elif origin is Union:
+        node.update(type="union", options=[describe(option) for option in get_args(tp)])
+    elif origin is Literal:
+        node.update(type="enum", values=list(get_args(tp)))
+    elif origin in (list, List):
+        node.update(type="array", items=describe(get_args(tp)[0]))
+    elif is_dataclass(tp):
+        shape = {}
+        for f, key, hint in schema_fields(tp):
+            child = describe(hint, f.metadata)
+            if f.default is not MISSING:
+                child["optional"] = True
+            if f.metadata.get("nullable"):
+                child["nullable"] = True
+            shape[key] = child
+        node.update(type="object", shape=dict(sorted(shape.items())))
+    elif tp in (float, int):
+        node["type"] = "number"
+        if tp is int:
+            node["int"] = True
+        if "ge" in checks or "gt" in checks:
+            node["min"] = [checks["ge"], True] if "ge" in checks else [checks["gt"], False]
+        if "le" in checks:
+            node["max"] = [checks["le"], True]
+    else:
+        node["type"] = {str: "string", bool: "boolean"}[tp]
+    return node
+
+if __name__ == "__main__":
+    if "--describe" in sys.argv:
+        print(json.dumps(describe(CineVideo), indent=2))
+        sys.exit(0)
+    if "--schema-only-stdin" in sys.argv:
+        # Zod-equivalent verdicts for a JSON list of payloads, used by check_schema_parity.ts
+        results = []
+        for payload in json.load(sys.stdin):
+            try:
+                parse_payload(payload, render_checks=False)
+                results.append(True)
+            except PayloadError:
+                results.append(False)
+        print(json.dumps(results))
+        sys.exit(0)
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if not paths:
+        print("Usage: python validate_payload.py <payload.json>... [--print] | --describe")
+        sys.exit(1)
+    failed = False
+    for path in paths:
+        with open(path) as f:
+            payload = json.load(f)
+        try:
+            props = validate_payload(payload)
+        except PayloadError as e:
+            print(f"❌ {path}:")
+            for issue_path, message in e.issues:
+                print(f"  - [Path: {issue_path or 'root'}]: {message}")
+            failed = True
+            continue
+        print(f"✅ {path} is valid.")
+        if "--print" in sys.argv:
+            print(json.dumps(props, indent=2))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,164 @@
+import { openBrowser, renderMedia, selectComposition } from "@remotion/renderer";
+import http from "node:http";
+import net from "node:net";
+import path from "node:path";
+import fs from "node:fs";
+import { AddressInfo } from "node:net";
+import { CineVideoProps } from "../remotion/schema";
+
+// Long-lived render process for modal_app.RenderWorker: one browser and one bundle
+// server per container, jobs arrive as newline-delimited JSON on a unix socket.
+
+type RenderRequest =
+  | { type: "ping" }
+  | {
+    type: "render";
+    composition: string;
+    outputLocation: string;
+    inputProps: CineVideoProps;
+    concurrency: number;
+    frameRange: [number, number] | null;
+    muted: boolean;
+    progress: boolean;
+  };
+
+// CLI-style progress lines ahead of the JSON reply, parsed by modal_app.ProgressChannel.track
+const PROGRESS_INTERVAL_MS = 1000;
+
+const [bundleDir, socketPath] = process.argv.slice(2);
+
+const chromiumOptions = {
+  gl: "swiftshader" as const,
+  ignoreCertificateErrors: true,
+};
+
+const contentTypes: Record<string, string> = {
+  ".html": "text/html",
+  ".js": "application/javascript",
+  ".css": "text/css",
+  ".json": "application/json",
+  ".map": "application/json",
+};
+
+const serveBundle = (dir: string) =>
+  new Promise<string>((resolve) => {
+    const server = http.createServer((req, res) => {
+      const urlPath = decodeURIComponent((req.url || "/").split("?")[0]);
+      const file = path.join(dir, urlPath === "/" ? "index.html" : urlPath);
+      if (!file.startsWith(dir) || !fs.existsSync(file) || fs.statSync(file).isDirectory()) {
+        res.statusCode = 404;
+        res.end();
+        return;
+      }
+      res.setHeader("Content-Type", contentTypes[path.extname(file)] || "application/octet-stream");
+      res.setHeader("Access-Control-Allow-Origin", "*");
+      fs.createReadStream(file).pipe(res);
+    });
+    server.listen(0, "127.0.0.1", () => {
+      resolve(`http://127.0.0.1:${(server.address() as AddressInfo).port}`);
+    });
+  });
+
+const main = async () => {
+  const startedAt = Date.now();
+  const browser = await openBrowser("chrome", { chromiumOptions });
+  const serveUrl = await serveBundle(path.resolve(bundleDir));
+  const startupMs = Date.now() - startedAt;
+
+  const handle = async (request: RenderRequest, conn: net.Socket) => {
+    if (request.type === "ping") {
+      return { ok: true, startupMs };
+    }
+
+    const renderStartedAt = Date.now();
+    try {
+      const composition = await selectComposition({
+        serveUrl,
+        id: request.composition,
+        inputProps: request.inputProps,
+        puppeteerInstance: browser,
+        chromiumOptions,
+      });
+
+      const total = request.frameRange
+        ? request.frameRange[1] - request.frameRange[0] + 1
+        : composition.durationInFrames;
+      let lastProgressAt = 0;
+      const onProgress = ({ renderedFrames, encodedFrames }: { renderedFrames: number; encodedFrames: number }) => {
+        const now = Date.now();
+        if (!request.progress || (now - lastProgressAt < PROGRESS_INTERVAL_MS && encodedFrames < total)) {
+          return;
+        }
+        lastProgressAt = now;
+        conn.write(`Rendered ${renderedFrames}/${total}\nEncoded ${encodedFrames}/${total}\n`);
+      };
+
+      await renderMedia({
+        serveUrl,
+        composition,
+        inputProps: request.inputProps,
+        codec: "h264",
+        outputLocation: request.outputLocation,
+        concurrency: request.concurrency,
+        frameRange: request.frameRange,
+        muted: request.muted,
+        puppeteerInstance: browser,
+        chromiumOptions,
+        timeoutInMilliseconds: 240000,
+        onProgress,
+      });
+
+      return { ok: true, renderMs: Date.now() - renderStartedAt };
+    } catch (error) {
+      console.error(`Sidecar render failed:`, error);
+      return { ok: false, error: (error as Error).message };
+    }
+  };
+
+  // Renders run one after another on the shared browser
+  let queue: Promise<unknown> = Promise.resolve();
+
+  if (fs.existsSync(socketPath)) {
+    fs.unlinkSync(socketPath);
+  }
+
+  net
+    .createServer((conn) => {
+      // A client that goes away mid-render must not take the shared sidecar down with it
+      conn.on("error", (error) => console.error(`Sidecar connection error:`, error.message));
+
+      let buffer = "";
+      const onData = (chunk: Buffer) => {
+        buffer += chunk.toString();
+        const newline = buffer.indexOf("\n");
+        if (newline === -1) {
+          return;
+        }
+        // One request per connection: stop reading once its line is in
+        conn.off("data", onData);
+        const line = buffer.slice(0, newline);
+        buffer = "";
+
+        let request: RenderRequest;
+        try {
+          request = JSON.parse(line) as RenderRequest;
+        } catch (error) {
+          conn.end(JSON.stringify({ ok: false, error: `Invalid request: ${(error as Error).message}` }) + "\n");
+          return;
+        }
+        queue = queue
+          .then(() => handle(request, conn))
+          .then((reply) => conn.end(JSON.stringify(reply) + "\n"))
+          .catch((error) => console.error(`Sidecar reply failed:`, error));
+      };
+      conn.on("data", onData);
+    })
+    .listen(socketPath, () => {
+      console.info(`Render sidecar ready in ${startupMs}ms`);
+    });
+};
+
+main().catch((err) => {
+  console.error("Render sidecar failed to start:", err);
+  process.exit(1);
+});